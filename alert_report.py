@@ -0,0 +1,107 @@
+import csv
+import datetime
+import json
+from reportlab.lib.pagesizes import letter
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.lib.enums import TA_CENTER
+from vitals import VITALS, VITAL_KEYS, format_value
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+    ('TOPPADDING', (0, 1), (-1, -1), 6)
+])
+
+# Builds the comprehensive PDF alert report from an AlertStore. The rendered
+# table rows of each patient section are cached, and on every build only the
+# alerts added to the store since the previous build are turned into new rows.
+# Flowables are laid out (and split across pages) in place by doc.build, so
+# the headings, spacers and tables are created again for every build.
+class AlertReportBuilder:
+    def __init__(self, report_file):
+        self.report_file = report_file
+        self.styles = getSampleStyleSheet()
+        self.styles.add(ParagraphStyle(name='TableHeader', alignment=TA_CENTER, fontSize=10, fontName='Helvetica-Bold', textColor=colors.whitesmoke, backColor=colors.grey, padding=3))
+        self.styles.add(ParagraphStyle(name='TableCell', alignment=TA_CENTER, fontSize=8, fontName='Helvetica', padding=3))
+        self.header_row = [Paragraph(title, self.styles['TableHeader'])
+                           for title in ("Timestamp",) + tuple(vital.label for vital in VITALS) + ("Alert",)]
+        self.reset()
+
+    def reset(self):
+        self.sections = {}
+
+    def render_row(self, alert):
+        cell = self.styles['TableCell']
+        return ([Paragraph(alert.timestamp, cell)]
+                + [Paragraph(format_value(vital, value), cell) for vital, value in zip(VITALS, alert.values)]
+                + [Paragraph(alert.alert, cell)])
+
+    # Returns the number of patient sections that had new alerts
+    def build(self, alert_store):
+        doc = SimpleDocTemplate(self.report_file, pagesize=letter)
+        elements = [Paragraph("Comprehensive Alert Report", self.styles['Title']),
+                    Paragraph(f"Generated on: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", self.styles['Normal']),
+                    Spacer(1, 12)]
+
+        updated = 0
+        for patient_name in alert_store.patients():
+            section = self.sections.setdefault(patient_name, {"rows": [], "next_seq": 0})
+            new_alerts = alert_store.for_patient(patient_name, since_seq=section["next_seq"])
+            if new_alerts:
+                section["rows"].extend(self.render_row(alert) for alert in new_alerts)
+                section["next_seq"] = new_alerts[-1].seq + 1
+                updated += 1
+
+            columns = len(self.header_row)
+            table = Table([self.header_row] + section["rows"], colWidths=[doc.width/columns]*columns)
+            table.setStyle(TABLE_STYLE)
+            elements.extend([Paragraph(f"Alert Report for {patient_name}", self.styles['Heading2']),
+                             Spacer(1, 12), table, Spacer(1, 24)])
+
+        doc.build(elements)
+        return updated
+
+# Machine-readable exports streamed from an AlertStore: each call appends only
+# the records added since the previous call to a CSV and a JSON Lines file.
+class AlertExporter:
+    FIELDS = ("seq", "time", "patient", "timestamp") + VITAL_KEYS + ("types", "alert")
+
+    def __init__(self, csv_file, jsonl_file):
+        self.csv_file = csv_file
+        self.jsonl_file = jsonl_file
+        self.reset()
+
+    def reset(self):
+        self.next_seq = 0
+
+    def as_row(self, alert):
+        row = {"seq": alert.seq, "time": alert.time, "patient": alert.patient, "timestamp": alert.timestamp}
+        row.update(zip(VITAL_KEYS, alert.values))
+        row.update(types=";".join(alert.types), alert=alert.alert.strip())
+        return row
+
+    # Returns the number of records written
+    def export(self, alert_store):
+        records = alert_store.since(self.next_seq)
+        mode = "w" if self.next_seq == 0 else "a"
+        with open(self.csv_file, mode, newline="") as csv_out, open(self.jsonl_file, mode) as jsonl_out:
+            writer = csv.DictWriter(csv_out, fieldnames=self.FIELDS)
+            if mode == "w":
+                writer.writeheader()
+            for alert in records:
+                row = self.as_row(alert)
+                writer.writerow(row)
+                jsonl_out.write(json.dumps(row) + "\n")
+        self.next_seq += len(records)
+        return len(records)
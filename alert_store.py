@@ -0,0 +1,168 @@
+import bisect
+import heapq
+import threading
+import time
+from collections import Counter, namedtuple
+
+# A run of the same alert for the same patient
+class AlertEpisode:
+    __slots__ = ("patient", "alert", "first_seen", "last_seen", "count")
+
+    def __init__(self, patient, alert, seen_at):
+        self.patient = patient
+        self.alert = alert
+        self.first_seen = seen_at
+        self.last_seen = seen_at
+        self.count = 1
+
+# In-memory index collapsing repeated alerts into episodes: an alert joins the
+# patient's open episode for the same alert text unless more than `gap`
+# seconds passed since that episode was last seen. Episodes are kept in
+# creation order so a window of rows is a slice, whatever the total count.
+class AlertEpisodeIndex:
+    def __init__(self, gap=60.0):
+        self.gap = gap
+        self.lock = threading.Lock()
+        self.open = {}
+        self.episodes = []
+        self.version = 0
+
+    def record(self, patient, alert, seen_at):
+        key = (patient, alert)
+        with self.lock:
+            episode = self.open.get(key)
+            if episode is not None and seen_at - episode.last_seen <= self.gap:
+                episode.last_seen = max(episode.last_seen, seen_at)
+                episode.count += 1
+            else:
+                episode = self.open[key] = AlertEpisode(patient, alert, seen_at)
+                self.episodes.append(episode)
+            self.version += 1
+            return episode
+
+    def __len__(self):
+        return len(self.episodes)
+
+    # Rows start..start+size, newest episode first
+    def window(self, start, size):
+        with self.lock:
+            end = len(self.episodes) - start
+            return self.episodes[max(end - size, 0):max(end, 0)][::-1]
+
+# One stored alert; `values` holds the vitals of the reading in VITALS order
+AlertRecord = namedtuple("AlertRecord", ("patient", "timestamp", "values", "alert", "types", "time", "seq"))
+
+# Point-in-time view of an AlertStore with the same read interface as the
+# store (since, patients, for_patient). The store's lists are append-only and
+# clear() replaces them, so the view only records their lengths: taking it
+# copies no record and later alerts never show up in it.
+class AlertSnapshot:
+    def __init__(self, records, by_patient, patient_counts):
+        self.records = records
+        self.count = len(records)
+        self.by_patient = by_patient
+        self.patient_counts = patient_counts
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self.since(0))
+
+    def since(self, seq):
+        return self.records[seq:self.count]
+
+    def patients(self):
+        return list(self.patient_counts)
+
+    def for_patient(self, patient, since_seq=0):
+        records = self.by_patient.get(patient, [])[:self.patient_counts.get(patient, 0)]
+        if since_seq:
+            records = records[bisect.bisect_left(records, since_seq, key=lambda record: record.seq):]
+        return records
+
+# Append-only alert store indexed by patient, alert type and time. Records are
+# stamped with the ingestion time under the lock, so the global and
+# per-patient time indexes stay sorted by construction and range queries are
+# binary searches instead of scans of the whole log.
+class AlertStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.records = []
+            self.times = []
+            self.by_patient = {}
+            self.patient_times = {}
+            self.by_type = {}
+            self.type_counts = Counter()
+
+    def add(self, patient, timestamp, values, alert, types):
+        with self.lock:
+            now = time.time()
+            record = AlertRecord(patient, timestamp, tuple(values), alert, tuple(types), now, len(self.records))
+            self.records.append(record)
+            self.times.append(now)
+            self.by_patient.setdefault(patient, []).append(record)
+            self.patient_times.setdefault(patient, []).append(now)
+            for alert_type in record.types:
+                self.by_type.setdefault(alert_type, []).append(record)
+            self.type_counts.update(record.types)
+            return record
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.since(0))
+
+    # Consistent view for long readers (report, exports) that never blocks
+    # the consumers after it is taken
+    def snapshot(self):
+        with self.lock:
+            return AlertSnapshot(self.records, self.by_patient, {patient: len(records) for patient, records in self.by_patient.items()})
+
+    # Records appended after the first `seq` ones (for incremental consumers)
+    def since(self, seq):
+        with self.lock:
+            return self.records[seq:]
+
+    def patients(self):
+        with self.lock:
+            return list(self.by_patient)
+
+    def for_patient(self, patient, since_seq=0):
+        with self.lock:
+            records = self.by_patient.get(patient, [])
+            if since_seq:
+                records = records[bisect.bisect_left(records, since_seq, key=lambda record: record.seq):]
+            return list(records)
+
+    def of_type(self, alert_type):
+        with self.lock:
+            return list(self.by_type.get(alert_type, []))
+
+    def between(self, start, end):
+        with self.lock:
+            return self.records[bisect.bisect_left(self.times, start):bisect.bisect_right(self.times, end)]
+
+    def count_since(self, patient, since):
+        with self.lock:
+            times = self.patient_times.get(patient, [])
+            return len(times) - bisect.bisect_left(times, since)
+
+    def counts_by_patient(self, since=None):
+        with self.lock:
+            if since is None:
+                return {patient: len(records) for patient, records in self.by_patient.items()}
+            return {patient: len(times) - bisect.bisect_left(times, since)
+                    for patient, times in self.patient_times.items() if times[-1] >= since}
+
+    def counts_by_type(self):
+        with self.lock:
+            return dict(self.type_counts)
+
+    def top_patients(self, k, since=None):
+        return heapq.nlargest(k, self.counts_by_patient(since).items(), key=lambda item: item[1])
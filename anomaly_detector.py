@@ -0,0 +1,109 @@
+import numpy as np
+from vitals import VITALS
+
+# Streaming detector of deviations from each patient's own baseline. For every
+# patient and vital it keeps a Welford mean/variance (with a forgetting
+# horizon of `window` readings so the baseline follows slow drifts) and a
+# two-sided CUSUM of the reading standardized against that baseline. A
+# reading is flagged when it lies more than `z_threshold` standard deviations
+# from the baseline (sudden spike) or while the CUSUM is above
+# `cusum_threshold` (sustained shift). During such an alarm the baseline of
+# the vital is held, so a shift is not absorbed into it; the CUSUM is capped
+# at `cusum_threshold + 2 * cusum_slack` so the alarm ends a few readings
+# after the level returns. A vital still in alarm after `hold_limit` readings
+# takes the new level as its baseline (warming up again), which also
+# recovers from a baseline learnt during an anomaly. State lives in
+# (patients x vitals) arrays, so a batch is updated with a few NumPy
+# operations and the cost per reading is constant.
+# A detector has no lock: each consumer owns one for the patients of its
+# partition.
+class AnomalyDetector:
+    def __init__(self, vitals=len(VITALS), capacity=128, window=600, warmup=30, z_threshold=5.0,
+                 cusum_slack=1.0, cusum_threshold=5.0, hold_limit=120):
+        self.vitals = vitals
+        self.window = window
+        self.warmup = warmup
+        self.z_threshold = z_threshold
+        self.cusum_slack = cusum_slack
+        self.cusum_threshold = cusum_threshold
+        self.hold_limit = hold_limit
+        self.count = np.zeros((0, vitals), dtype=np.int64)
+        self.held = np.zeros((0, vitals), dtype=np.int64)
+        self.mean = np.zeros((0, vitals))
+        self.m2 = np.zeros((0, vitals))
+        self.cusum_high = np.zeros((0, vitals))
+        self.cusum_low = np.zeros((0, vitals))
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        extra = capacity - len(self.count)
+        if extra <= 0:
+            return
+        self.count, self.held, self.mean, self.m2, self.cusum_high, self.cusum_low = (
+            np.concatenate([array, np.zeros((extra, self.vitals), dtype=array.dtype)])
+            for array in (self.count, self.held, self.mean, self.m2, self.cusum_high, self.cusum_low))
+
+    # patient_ids: (n,) ints, values: (n, vitals). Returns an (n, vitals)
+    # boolean array of flagged readings. Rows are applied in order; repeated
+    # patients are handled in rounds so each round touches a patient once.
+    def update(self, patient_ids, values):
+        patient_ids = np.asarray(patient_ids, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64).reshape(len(patient_ids), self.vitals)
+        flags = np.zeros(values.shape, dtype=bool)
+        if not len(patient_ids):
+            return flags
+
+        order = np.argsort(patient_ids, kind="stable")
+        _, first, inverse = np.unique(patient_ids[order], return_index=True, return_inverse=True)
+        rank = np.empty(len(patient_ids), dtype=np.int64)
+        rank[order] = np.arange(len(patient_ids)) - first[inverse]
+
+        if patient_ids.max() >= len(self.count):
+            self.grow(max(int(patient_ids.max()) + 1, 2 * len(self.count)))
+        for round_ in range(int(rank.max()) + 1):
+            rows = np.flatnonzero(rank == round_)
+            flags[rows] = self.update_unique(patient_ids[rows], values[rows])
+        return flags
+
+    def update_unique(self, ids, x):
+        count = self.count[ids]
+        mean = self.mean[ids]
+        m2 = self.m2[ids]
+
+        # Score against the baseline before this reading joins it
+        std = np.sqrt(m2 / np.maximum(count - 1, 1))
+        std = np.where(std > 1e-9, std, np.inf)
+        warm = count >= self.warmup
+        spike = warm & (np.abs(x - mean) > self.z_threshold * std)
+
+        score = np.where(warm, (x - mean) / std, 0.0)
+        limit = self.cusum_threshold + 2.0 * self.cusum_slack
+        cusum_high = np.clip(self.cusum_high[ids] + score - self.cusum_slack, 0.0, limit)
+        cusum_low = np.clip(self.cusum_low[ids] - score - self.cusum_slack, 0.0, limit)
+        shift = warm & ((cusum_high > self.cusum_threshold) | (cusum_low > self.cusum_threshold))
+        held = np.where(shift, self.held[ids] + 1, 0)
+
+        # Welford update, skipped for the vitals in alarm; past the window m2
+        # is scaled down so older readings fade out at the same rate as the
+        # mean
+        full = count >= self.window
+        n = np.minimum(count + 1, self.window)
+        delta = x - mean
+        updated_mean = mean + delta / n
+        updated_m2 = np.where(full, m2 * (self.window - 1) / self.window, m2) + delta * (x - updated_mean)
+        mean, m2, count = np.where(shift, mean, updated_mean), np.where(shift, m2, updated_m2), np.where(shift, count, n)
+
+        # Alarms lasting past hold_limit: start a new baseline from this reading
+        relearn = held > self.hold_limit
+        if relearn.any():
+            mean, m2, count = np.where(relearn, x, mean), np.where(relearn, 0.0, m2), np.where(relearn, 1, count)
+            cusum_high[relearn] = cusum_low[relearn] = 0.0
+            held[relearn] = 0
+
+        self.count[ids] = count
+        self.held[ids] = held
+        self.mean[ids] = mean
+        self.m2[ids] = m2
+        self.cusum_high[ids] = cusum_high
+        self.cusum_low[ids] = cusum_low
+        return spike | shift
@@ -0,0 +1,82 @@
+import itertools
+import threading
+
+# Registry of the patients being monitored, indexed both ways (id -> name and
+# name -> id) so lookups are O(1) whatever the number of beds. Patients can be
+# admitted and discharged at runtime; subscribers are called with
+# ("admit" | "discharge", patient_id) so per-patient structures follow along.
+# Names of discharged patients stay resolvable for in-flight readings and logs.
+# Reading sequence numbers are issued here too, one counter per patient, so
+# they keep increasing across producer restarts.
+class PatientRegistry:
+    def __init__(self, bed_count=0):
+        self.lock = threading.Lock()
+        self.names = {}
+        self.ids = {}
+        self.active = {}
+        self.next_id = 0
+        self.sequences = {}
+        self.listeners = []
+        for _ in range(bed_count):
+            self.admit()
+
+    def subscribe(self, callback):
+        self.listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        self.listeners.remove(callback)
+
+    def _notify(self, event, patient_id):
+        for callback in list(self.listeners):
+            callback(event, patient_id)
+
+    def admit(self, name=None):
+        with self.lock:
+            patient_id = self.next_id
+            name = name or f"Patient_{patient_id + 1}"
+            if name in self.ids:
+                raise ValueError(f"Patient already admitted: {name}")
+            self.next_id += 1
+            self.names[patient_id] = name
+            self.ids[name] = patient_id
+            self.active[patient_id] = name
+        self._notify("admit", patient_id)
+        return patient_id
+
+    def discharge(self, patient_id):
+        with self.lock:
+            name = self.active.pop(patient_id)
+            del self.ids[name]
+        self._notify("discharge", patient_id)
+
+    # next() on an itertools.count is atomic, so only creating the counter
+    # needs the lock
+    def next_sequence(self, patient_id):
+        counter = self.sequences.get(patient_id)
+        if counter is None:
+            with self.lock:
+                counter = self.sequences.setdefault(patient_id, itertools.count(1))
+        return next(counter)
+
+    def id_of(self, name):
+        return self.ids.get(name)
+
+    def __getitem__(self, patient_id):
+        return self.names[patient_id]
+
+    def __contains__(self, patient_id):
+        return patient_id in self.active
+
+    def __len__(self):
+        return len(self.active)
+
+    def __iter__(self):
+        return iter(self.patient_ids())
+
+    def patient_ids(self):
+        with self.lock:
+            return list(self.active)
+
+    def patient_names(self):
+        with self.lock:
+            return list(self.active.values())
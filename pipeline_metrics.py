@@ -0,0 +1,194 @@
+import threading
+import time
+import json
+from collections import Counter
+from contextlib import contextmanager
+
+# Latency histogram with log-linear buckets (HDR style): values below
+# 2**sub_bucket_bits microseconds get one bucket each, every power of two above
+# that is split into 2**(sub_bucket_bits - 1) linear buckets, so the relative
+# error stays bounded (~3% with the default 6 bits) at any magnitude.
+class LatencyHistogram:
+    def __init__(self, sub_bucket_bits=6):
+        self.sub_count = 1 << sub_bucket_bits
+        self.half_count = self.sub_count >> 1
+        self.sub_bucket_bits = sub_bucket_bits
+        self.counts = [0] * self.sub_count
+        self.total = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self.lock = threading.Lock()
+
+    def _index(self, value_us):
+        if value_us < self.sub_count:
+            return value_us
+        shift = value_us.bit_length() - self.sub_bucket_bits
+        return self.sub_count + (shift - 1) * self.half_count + ((value_us >> shift) - self.half_count)
+
+    def _upper_bound(self, index):
+        if index < self.sub_count:
+            return index
+        k = index - self.sub_count
+        shift = k // self.half_count + 1
+        mantissa = k % self.half_count + self.half_count
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds):
+        value_us = max(0, int(seconds * 1_000_000))
+        index = self._index(value_us)
+        with self.lock:
+            if index >= len(self.counts):
+                self.counts.extend([0] * (index + 1 - len(self.counts)))
+            self.counts[index] += 1
+            self.total += 1
+            self.sum += seconds
+            if self.min is None or seconds < self.min:
+                self.min = seconds
+            if self.max is None or seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, q):
+        with self.lock:
+            if not self.total:
+                return 0.0
+            target = q * self.total
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if count and seen >= target:
+                    return min(self._upper_bound(index) / 1_000_000, self.max)
+            return self.max
+
+    def summary(self):
+        return {
+            "count": self.total,
+            "mean": self.sum / self.total if self.total else 0.0,
+            "min": self.min or 0.0,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max or 0.0,
+        }
+
+# Registry for the pipeline: one latency histogram per stage, items handled per
+# thread, event counters and the sampled depth of the shared queue
+class PipelineMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.thread_counts = Counter()
+        self.events = Counter()
+        self.queue_depth = 0
+        self.queue_depth_max = 0
+        self.throughput = {}
+        self.shed = {}
+        self.over_capacity = 0
+        self.started_at = time.monotonic()
+        self._last_counts = Counter()
+        self._last_sample = self.started_at
+
+    def histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(stage, LatencyHistogram())
+        return histogram
+
+    def observe(self, stage, seconds):
+        self.histogram(stage).record(seconds)
+
+    @contextmanager
+    def time_stage(self, stage):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.monotonic() - start)
+
+    def count(self, thread_name, n=1):
+        with self.lock:
+            self.thread_counts[thread_name] += n
+
+    def increment(self, event, n=1):
+        with self.lock:
+            self.events[event] += n
+
+    # Called periodically (from the metrics panel): records the queue depth,
+    # shed counters and critical readings admitted past capacity, and turns
+    # the per-thread counters into items/s since the previous sample
+    def sample(self, queue_depth, shed=None, over_capacity=0):
+        now = time.monotonic()
+        with self.lock:
+            self.queue_depth = queue_depth
+            self.shed = dict(shed or {})
+            self.over_capacity = over_capacity
+            self.queue_depth_max = max(self.queue_depth_max, queue_depth)
+            elapsed = max(now - self._last_sample, 1e-9)
+            self.throughput = {name: (count - self._last_counts[name]) / elapsed
+                               for name, count in self.thread_counts.items()}
+            self._last_counts = Counter(self.thread_counts)
+            self._last_sample = now
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+            self.thread_counts = Counter()
+            self.events = Counter()
+            self.queue_depth = 0
+            self.queue_depth_max = 0
+            self.throughput = {}
+            self.shed = {}
+            self.over_capacity = 0
+            self.started_at = time.monotonic()
+            self._last_counts = Counter()
+            self._last_sample = self.started_at
+
+    def snapshot(self):
+        with self.lock:
+            histograms = dict(self.histograms)
+            snapshot = {
+                "uptime_seconds": time.monotonic() - self.started_at,
+                "queue_depth": self.queue_depth,
+                "queue_depth_max": self.queue_depth_max,
+                "thread_items": dict(self.thread_counts),
+                "events": dict(self.events),
+                "thread_throughput": dict(self.throughput),
+                "shed": dict(self.shed),
+                "admitted_over_capacity": self.over_capacity,
+            }
+        snapshot["stages"] = {stage: histogram.summary() for stage, histogram in sorted(histograms.items())}
+        return snapshot
+
+    def dump_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def dump_prometheus(self, path):
+        snapshot = self.snapshot()
+        lines = ["# TYPE pipeline_stage_latency_seconds summary"]
+        for stage, summary in snapshot["stages"].items():
+            for quantile in ("p50", "p95", "p99"):
+                lines.append(f'pipeline_stage_latency_seconds{{stage="{stage}",quantile="0.{quantile[1:]}"}} {summary[quantile]:.6f}')
+            lines.append(f'pipeline_stage_latency_seconds_sum{{stage="{stage}"}} {summary["mean"] * summary["count"]:.6f}')
+            lines.append(f'pipeline_stage_latency_seconds_count{{stage="{stage}"}} {summary["count"]}')
+        lines.append("# TYPE pipeline_queue_depth gauge")
+        lines.append(f"pipeline_queue_depth {snapshot['queue_depth']}")
+        lines.append("# TYPE pipeline_queue_depth_max gauge")
+        lines.append(f"pipeline_queue_depth_max {snapshot['queue_depth_max']}")
+        lines.append("# TYPE pipeline_shed_total counter")
+        for reason, count in sorted(snapshot["shed"].items()):
+            lines.append(f'pipeline_shed_total{{reason="{reason}"}} {count}')
+        lines.append("# TYPE pipeline_admitted_over_capacity_total counter")
+        lines.append(f"pipeline_admitted_over_capacity_total {snapshot['admitted_over_capacity']}")
+        lines.append("# TYPE pipeline_events_total counter")
+        for event, count in sorted(snapshot["events"].items()):
+            lines.append(f'pipeline_events_total{{event="{event}"}} {count}')
+        lines.append("# TYPE pipeline_thread_items_total counter")
+        for name, count in sorted(snapshot["thread_items"].items()):
+            lines.append(f'pipeline_thread_items_total{{thread="{name}"}} {count}')
+        lines.append("# TYPE pipeline_thread_throughput gauge")
+        for name, rate in sorted(snapshot["thread_throughput"].items()):
+            lines.append(f'pipeline_thread_throughput{{thread="{name}"}} {rate:.3f}')
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
@@ -0,0 +1,292 @@
+import bisect
+import hashlib
+import queue
+from collections import Counter, deque
+
+# Bounded queue for sensor readings that sheds load predictably when ingestion
+# outruns analysis. Readings flagged as critical (they trip a critical alert
+# rule) go to a priority lane that get() always serves first. When the queue is
+# full a critical reading takes the place of the oldest routine one; with no
+# routine reading left it is admitted past capacity up to `critical_headroom`
+# (a fraction of capacity, counted in `admitted_over_capacity`) and rejected
+# beyond. Routine readings are handled by policy:
+#   - "block": the producer waits until there is room
+#   - "drop_oldest": the oldest queued routine reading is discarded
+#   - "downsample": above the watermark only every Nth routine reading of a
+#     patient is kept; the rest (and anything arriving when full) is shed
+# An entry may carry several readings (a block of sensor readings, put with
+# the patient id of each reading as `keys`): capacity, depth and the shed
+# counters all count readings, not entries. Such an entry is downsampled
+# reading by reading when `select` (a function returning the entry cut down
+# to the readings flagged in a list of booleans) is given, and kept whole
+# when any of its readings is due otherwise. Everything that is discarded is
+# counted in `shed` (by reason) and `shed_by_patient`.
+class SheddingQueue(queue.Queue):
+    POLICIES = ("block", "drop_oldest", "downsample")
+
+    def __init__(self, capacity=1000, policy="block", downsample_watermark=0.5, downsample_keep=4, critical_headroom=0.1):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown shedding policy: {policy}")
+        # The underlying queue.Queue is unbounded, capacity is enforced in put()
+        queue.Queue.__init__(self)
+        self.capacity = capacity
+        self.policy = policy
+        self.downsample_watermark = downsample_watermark
+        self.downsample_keep = downsample_keep
+        self.critical_limit = capacity + max(1, int(capacity * critical_headroom))
+        self.shed = Counter()
+        self.shed_by_patient = Counter()
+        self.admitted_over_capacity = 0
+        self._downsample_seen = Counter()
+
+    def _init(self, maxsize):
+        self.queue = deque()
+        self.priority = deque()
+        self.readings = 0
+        self.priority_readings = 0
+
+    def _qsize(self):
+        return len(self.queue) + len(self.priority)
+
+    @staticmethod
+    def _size(keys):
+        return 1 if keys is None else len(keys)
+
+    def _put(self, entry):
+        critical, key, keys, item = entry
+        self.readings += self._size(keys)
+        if critical:
+            self.priority.append((key, keys, item))
+            self.priority_readings += self._size(keys)
+        else:
+            self.queue.append((key, keys, item))
+
+    def _get(self):
+        if self.priority:
+            _, keys, item = self.priority.popleft()
+            self.priority_readings -= self._size(keys)
+        else:
+            _, keys, item = self.queue.popleft()
+        self.readings -= self._size(keys)
+        return item
+
+    def _shed(self, reason, key, keys=None):
+        if keys is not None:
+            self.shed[reason] += len(keys)
+            self.shed_by_patient.update(keys)
+            return
+        self.shed[reason] += 1
+        if key is not None:
+            self.shed_by_patient[key] += 1
+
+    def _drop_oldest_routine(self, reason="dropped_oldest"):
+        if not self.queue:
+            return False
+        key, keys, _ = self.queue.popleft()
+        self.readings -= self._size(keys)
+        self.unfinished_tasks -= 1
+        self._shed(reason, key, keys)
+        return True
+
+    # Counts one reading per key and flags those to keep (every Nth of each
+    # patient)
+    def _downsample(self, keys):
+        kept = []
+        for key in keys:
+            self._downsample_seen[key] += 1
+            kept.append(self._downsample_seen[key] % self.downsample_keep == 0)
+        return kept
+
+    # An entry fits when its readings stay within `limit`; an empty queue
+    # takes any entry, so a block larger than the queue is never stuck
+    # (callers split blocks to the capacity to keep the bound)
+    def _fits(self, size, limit):
+        return self.readings == 0 or self.readings + size <= limit
+
+    # Makes room by dropping the oldest routine entries; False if the entry
+    # still does not fit
+    def _make_room(self, size, reason):
+        while not self._fits(size, self.capacity):
+            if not self._drop_oldest_routine(reason):
+                return False
+        return True
+
+    # Returns True when the item was queued and False when it was shed
+    def put(self, item, block=True, timeout=None, critical=False, key=None, keys=None, select=None):
+        size = self._size(keys)
+        with self.not_full:
+            # Wait for room under the block policy; a producer woken by a
+            # policy change is then admitted (or shed) by the new policy
+            if not critical and self.policy == "block" and not self._fits(size, self.capacity):
+                if not block:
+                    raise queue.Full
+                if not self.not_full.wait_for(lambda: self._fits(size, self.capacity) or self.policy != "block", timeout):
+                    raise queue.Full
+            if critical:
+                if not self._make_room(size, "dropped_for_critical"):
+                    if not self._fits(size, self.critical_limit):
+                        self._shed("rejected_critical", key, keys)
+                        return False
+                    self.admitted_over_capacity += size
+            elif self.policy == "drop_oldest":
+                if not self._make_room(size, "dropped_oldest"):
+                    self._shed("rejected", key, keys)
+                    return False
+            elif self.policy == "downsample":
+                if self.readings >= self.capacity * self.downsample_watermark:
+                    kept = self._downsample([key] if keys is None else keys)
+                    if not any(kept):
+                        self._shed("downsampled", key, keys)
+                        return False
+                    if select is not None and not all(kept):
+                        self._shed("downsampled", key, [k for k, keep in zip(keys, kept) if not keep])
+                        item = select(kept)
+                        keys = [k for k, keep in zip(keys, kept) if keep]
+                        size = len(keys)
+                if not self._fits(size, self.capacity):
+                    self._shed("rejected", key, keys)
+                    return False
+            self._put((critical, key, keys, item))
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+            return True
+
+    # Queues a control entry (e.g. a shutdown sentinel) ahead of the readings,
+    # past capacity and shedding, so it is never rejected
+    def put_sentinel(self, item):
+        with self.mutex:
+            self._put((True, None, None, item))
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def set_policy(self, policy):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown shedding policy: {policy}")
+        with self.mutex:
+            self.policy = policy
+            self._downsample_seen.clear()
+            # Producers blocked under the old policy must re-check
+            self.not_full.notify_all()
+
+    # Readings queued (qsize() counts entries)
+    def depth(self):
+        with self.mutex:
+            return self.readings
+
+    def priority_depth(self):
+        with self.mutex:
+            return self.priority_readings
+
+    def shed_counts(self):
+        with self.mutex:
+            return dict(self.shed)
+
+    def over_capacity(self):
+        with self.mutex:
+            return self.admitted_over_capacity
+
+    # Entries queued or still being processed (taken but not task_done())
+    def pending(self):
+        with self.mutex:
+            return self.unfinished_tasks
+
+    # Sheds everything still queued, returns the number of readings discarded
+    def discard(self, reason="discarded"):
+        with self.mutex:
+            discarded = self.readings
+            for key, keys, _ in list(self.queue) + list(self.priority):
+                self._shed(reason, key, keys)
+            self.unfinished_tasks -= self._qsize()
+            self.queue.clear()
+            self.priority.clear()
+            self.readings = self.priority_readings = 0
+            if not self.unfinished_tasks:
+                self.all_tasks_done.notify_all()
+            self.not_full.notify_all()
+            return discarded
+
+# Consistent-hash ring mapping patients onto partitions, with virtual nodes to
+# spread the load; adding or removing a partition only moves the patients of
+# the neighbouring ring segments
+class ConsistentHashRing:
+    def __init__(self, nodes, replicas=64):
+        self.replicas = replicas
+        self.ring = []
+        self.owners = {}
+        self.cache = {}
+        for node in nodes:
+            self.add_node(node)
+
+    @staticmethod
+    def _hash(value):
+        return int.from_bytes(hashlib.md5(str(value).encode()).digest()[:8], "big")
+
+    def add_node(self, node):
+        for replica in range(self.replicas):
+            point = self._hash(f"{node}#{replica}")
+            self.owners[point] = node
+            bisect.insort(self.ring, point)
+        self.cache.clear()
+
+    def remove_node(self, node):
+        for replica in range(self.replicas):
+            point = self._hash(f"{node}#{replica}")
+            if self.owners.pop(point, None) is not None:
+                self.ring.remove(point)
+        self.cache.clear()
+
+    def lookup(self, key):
+        node = self.cache.get(key)
+        if node is None:
+            index = bisect.bisect(self.ring, self._hash(key)) % len(self.ring)
+            node = self.cache[key] = self.owners[self.ring[index]]
+        return node
+
+# One SheddingQueue per consumer. Each patient is hashed onto a single
+# partition, so its readings are handled in order by one worker and consumers
+# never contend on the same queue lock.
+class PartitionedQueues:
+    def __init__(self, partitions, capacity=1000, policy="block"):
+        per_partition = -(-capacity // partitions)
+        self.partitions = [SheddingQueue(capacity=per_partition, policy=policy) for _ in range(partitions)]
+        self.ring = ConsistentHashRing(range(partitions))
+        self.capacity = per_partition * partitions
+
+    @property
+    def policy(self):
+        return self.partitions[0].policy
+
+    def partition_for(self, key):
+        return self.ring.lookup(key)
+
+    def put(self, key, item, block=True, timeout=None, critical=False):
+        return self.partitions[self.ring.lookup(key)].put(item, block, timeout, critical=critical, key=key)
+
+    # Readings queued
+    def depth(self):
+        return sum(partition.depth() for partition in self.partitions)
+
+    def depths(self):
+        return [partition.depth() for partition in self.partitions]
+
+    def priority_depth(self):
+        return sum(partition.priority_depth() for partition in self.partitions)
+
+    def set_policy(self, policy):
+        for partition in self.partitions:
+            partition.set_policy(policy)
+
+    def pending(self):
+        return sum(partition.pending() for partition in self.partitions)
+
+    def discard(self, reason="discarded"):
+        return sum(partition.discard(reason) for partition in self.partitions)
+
+    def shed_counts(self):
+        shed = Counter()
+        for partition in self.partitions:
+            shed.update(partition.shed_counts())
+        return dict(shed)
+
+    def over_capacity(self):
+        return sum(partition.over_capacity() for partition in self.partitions)
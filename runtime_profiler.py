@@ -0,0 +1,172 @@
+import cProfile
+import pstats
+import sys
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+_NO_SECTION = nullcontext()
+
+# From Python 3.12 cProfile is built on sys.monitoring: only one profiler can
+# be enabled in the interpreter, and it traces every thread
+SHARED_CPROFILE = sys.version_info >= (3, 12)
+
+# Profiler that can be switched on for a time window while the application runs.
+# Threads register the role they play (producer, consumer, forecaster, gui) and
+# at the end of the window one profile per role is written to output_dir:
+#   - "sampling": a background thread snapshots every registered thread's stack
+#     with sys._current_frames() and writes collapsed stacks (<role>-<time>.folded,
+#     usable with flamegraph.pl / speedscope)
+#   - "cprofile": the work wrapped in section() is traced with cProfile and the
+#     per-thread profiles are merged per role (<role>-<time>.prof, see pstats).
+#     From Python 3.12 a single profile traces all threads for the whole
+#     window instead (all-<time>.prof) and section() does nothing.
+# When no capture is running section() returns a shared no-op context manager,
+# so the instrumented hot paths only pay an attribute check. Profiler errors
+# are never raised into the instrumented code.
+class RuntimeProfiler:
+    MODES = ("sampling", "cprofile")
+
+    def __init__(self, output_dir="profiles", sample_interval=0.01):
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.lock = threading.Lock()
+        self.roles = {}
+        self.mode = None
+        self.deadline = 0.0
+        self.samples = {}
+        self.profiles = {}
+        self.open_sections = 0
+        self.on_complete = None
+
+    def register(self, role):
+        self.roles[threading.get_ident()] = role
+
+    def unregister(self):
+        self.roles.pop(threading.get_ident(), None)
+
+    @property
+    def active(self):
+        return self.mode is not None
+
+    def start(self, duration, mode="sampling", on_complete=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        with self.lock:
+            if self.mode is not None:
+                return False
+            self.samples = {}
+            self.profiles = {}
+            self.on_complete = on_complete
+            self.deadline = time.monotonic() + duration
+            self.mode = mode
+        threading.Thread(target=self._run, name="Profiler", daemon=True).start()
+        return True
+
+    def stop(self):
+        self.deadline = 0.0
+
+    def section(self):
+        if self.mode != "cprofile" or SHARED_CPROFILE:
+            return _NO_SECTION
+        return self._profiled_section()
+
+    @contextmanager
+    def _profiled_section(self):
+        ident = threading.get_ident()
+        with self.lock:
+            entry = self.profiles.get(ident)
+            if entry is None:
+                entry = self.profiles[ident] = (self.roles.get(ident, "other"), cProfile.Profile())
+            self.open_sections += 1
+        try:
+            entry[1].enable()
+            enabled = True
+        except Exception:
+            enabled = False  # e.g. another profiling tool is active
+        try:
+            yield
+        finally:
+            try:
+                if enabled:
+                    entry[1].disable()
+            except Exception:
+                pass
+            with self.lock:
+                self.open_sections -= 1
+
+    def _run(self):
+        sampling = self.mode == "sampling"
+        if self.mode == "cprofile" and SHARED_CPROFILE:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                profile = None  # another profiling tool is active
+            if profile is not None:
+                self.profiles[threading.get_ident()] = ("all", profile)
+        while time.monotonic() < self.deadline:
+            if sampling:
+                self._sample()
+            time.sleep(self.sample_interval)
+        if self.mode == "cprofile" and SHARED_CPROFILE and self.profiles:
+            self.profiles[threading.get_ident()][1].disable()
+        self._finish()
+
+    def _sample(self):
+        own = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            role = self.roles.get(ident)
+            if role is None or ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                frame = frame.f_back
+            self.samples.setdefault(role, Counter())[";".join(reversed(stack))] += 1
+
+    def _finish(self):
+        with self.lock:
+            mode = self.mode
+            self.mode = None
+        # Give sections that were entered before the switch time to close
+        grace_deadline = time.monotonic() + 1.0
+        while self.open_sections and time.monotonic() < grace_deadline:
+            time.sleep(0.01)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        paths = []
+        if mode == "sampling":
+            for role, stacks in self.samples.items():
+                path = os.path.join(self.output_dir, f"{role}-{stamp}.folded")
+                with open(path, "w") as f:
+                    for stack, count in stacks.most_common():
+                        f.write(f"{stack} {count}\n")
+                paths.append(path)
+        else:
+            by_role = {}
+            for role, profile in self.profiles.values():
+                by_role.setdefault(role, []).append(profile)
+            for role, profiles in by_role.items():
+                # Profiles that never ran have no stats to merge
+                stats = None
+                for profile in profiles:
+                    try:
+                        if stats is None:
+                            stats = pstats.Stats(profile)
+                        else:
+                            stats.add(profile)
+                    except TypeError:
+                        continue
+                if stats is None:
+                    continue
+                path = os.path.join(self.output_dir, f"{role}-{stamp}.prof")
+                stats.dump_stats(path)
+                paths.append(path)
+
+        if self.on_complete is not None:
+            self.on_complete(mode, paths)
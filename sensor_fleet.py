@@ -0,0 +1,98 @@
+import time
+from collections import namedtuple
+import numpy as np
+from vitals import VITALS, VITAL_KEYS, round_values
+
+# A block of readings: the patient id and time of each row, and the vitals of
+# all rows as one (rows x vitals) array in VITALS order
+ReadingBlock = namedtuple("ReadingBlock", ("patient_ids", "times", "values"))
+
+# Offsets added to a patient's vitals while an anomaly episode is running
+ANOMALY_KINDS = ("fever", "tachycardia", "hypoxia", "hypertension")
+ANOMALY_EFFECTS = {
+    "fever": {"temperature": 1.8, "heart_rate": 12.0, "respiratory_rate": 4.0},
+    "tachycardia": {"heart_rate": 35.0, "oxygen_level": -1.0, "systolic": 5.0, "diastolic": 3.0, "respiratory_rate": 3.0},
+    "hypoxia": {"heart_rate": 10.0, "oxygen_level": -7.0, "respiratory_rate": 8.0},
+    "hypertension": {"heart_rate": 5.0, "systolic": 30.0, "diastolic": 15.0},
+}
+ANOMALY_OFFSETS = np.array([[ANOMALY_EFFECTS[kind].get(key, 0.0) for key in VITAL_KEYS] for kind in ANOMALY_KINDS])
+
+# Vectorized simulator for a whole fleet of bedside sensors. Each patient has
+# its own baseline, a slow mean-reverting drift and measurement noise; anomaly
+# episodes (fever, tachycardia, hypoxia, hypertension) start at random and
+# last a random number of ticks. tick() returns the readings of every patient
+# as one ReadingBlock, without any per-reading Python work.
+class SensorFleet:
+    BASELINE_MEAN, BASELINE_SPREAD, NOISE = (np.array(column) for column in zip(*(vital.fleet_profile for vital in VITALS)))
+    VALID_LOW, VALID_HIGH = (np.array(column, dtype=float) for column in zip(*(vital.valid_range for vital in VITALS)))
+    DRIFT_STEP = NOISE * 0.05
+    DRIFT_DECAY = 0.98
+
+    def __init__(self, patient_ids, seed=None, anomaly_rate=0.002, anomaly_duration=(10, 60)):
+        self.rng = np.random.default_rng(seed)
+        self.anomaly_rate = anomaly_rate
+        self.anomaly_duration = anomaly_duration
+        self.patient_ids = np.empty(0, dtype=np.int64)
+        self.baseline = np.empty((0, len(VITALS)))
+        self.drift = np.empty((0, len(VITALS)))
+        self.anomaly_kind = np.empty(0, dtype=np.int64)
+        self.anomaly_left = np.empty(0, dtype=np.int64)
+        self.set_patients(patient_ids)
+
+    # Keeps the state of patients already simulated and draws new baselines
+    # for the others
+    def set_patients(self, patient_ids):
+        patient_ids = np.asarray(list(patient_ids), dtype=np.int64)
+        index = {patient_id: row for row, patient_id in enumerate(self.patient_ids.tolist())}
+        kept = np.array([index.get(patient_id, -1) for patient_id in patient_ids.tolist()], dtype=np.int64)
+        new = kept < 0
+        count = len(patient_ids)
+
+        baseline = np.empty((count, len(VITALS)))
+        baseline[~new] = self.baseline[kept[~new]]
+        baseline[new] = self.rng.normal(self.BASELINE_MEAN, self.BASELINE_SPREAD, (int(new.sum()), len(VITALS)))
+        drift = np.zeros((count, len(VITALS)))
+        drift[~new] = self.drift[kept[~new]]
+        anomaly_kind = np.full(count, -1, dtype=np.int64)
+        anomaly_kind[~new] = self.anomaly_kind[kept[~new]]
+        anomaly_left = np.zeros(count, dtype=np.int64)
+        anomaly_left[~new] = self.anomaly_left[kept[~new]]
+
+        self.patient_ids = patient_ids
+        self.baseline, self.drift = baseline, drift
+        self.anomaly_kind, self.anomaly_left = anomaly_kind, anomaly_left
+
+    def __len__(self):
+        return len(self.patient_ids)
+
+    def step_anomalies(self):
+        count = len(self.patient_ids)
+        starting = (self.anomaly_left == 0) & (self.rng.random(count) < self.anomaly_rate)
+        started = int(starting.sum())
+        if started:
+            self.anomaly_kind[starting] = self.rng.integers(0, len(ANOMALY_KINDS), started)
+            self.anomaly_left[starting] = self.rng.integers(self.anomaly_duration[0], self.anomaly_duration[1] + 1, started)
+        active = self.anomaly_left > 0
+        offsets = np.zeros((count, len(VITALS)))
+        offsets[active] = ANOMALY_OFFSETS[self.anomaly_kind[active]]
+        self.anomaly_left[active] -= 1
+        self.anomaly_kind[self.anomaly_left == 0] = -1
+        return offsets
+
+    def tick(self, readings_per_patient=1, now=None):
+        now = time.time() if now is None else now
+        count = len(self.patient_ids)
+        self.drift = self.DRIFT_DECAY * self.drift + self.rng.normal(0.0, self.DRIFT_STEP, (count, len(VITALS)))
+        expected = self.baseline + self.drift + self.step_anomalies()
+
+        values = np.repeat(expected, readings_per_patient, axis=0)
+        values += self.rng.normal(0.0, self.NOISE, values.shape)
+        values = round_values(np.clip(values, self.VALID_LOW, self.VALID_HIGH))
+
+        # Readings of one tick are spread evenly over the following second
+        offsets = np.tile(np.arange(readings_per_patient) / readings_per_patient, count)
+        return ReadingBlock(np.repeat(self.patient_ids, readings_per_patient), now + offsets, values)
+
+# Splits a block into the readings selected by a boolean mask
+def select_rows(block, mask):
+    return ReadingBlock(*(column[mask] for column in block))
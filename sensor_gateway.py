@@ -0,0 +1,285 @@
+import argparse
+import asyncio
+import struct
+import threading
+import time
+import numpy as np
+from sensor_fleet import SensorFleet, ReadingBlock
+from vitals import VITALS, VITAL_KEYS, round_values
+
+# Wire format: every frame is a little-endian uint32 payload length followed by
+# the payload, a batch header (magic, reading count) and `count` packed
+# records. Over UDP each datagram carries exactly one frame. A record holds
+# the patient id, the reading time and one float32 per vital in VITALS order.
+FRAME_HEADER = struct.Struct("<I")
+BATCH_HEADER = struct.Struct("<4sI")
+MAGIC = b"VSB2"
+RECORD_DTYPE = np.dtype([("patient_id", "<u4"), ("time", "<f8")] + [(key, "<f4") for key in VITAL_KEYS])
+MAX_FRAME_BYTES = 1 << 20
+# Longest wait for open connections, then for the server, to close on stop
+STOP_TIMEOUT = 2.0  # seconds
+
+class FrameError(Exception):
+    pass
+
+def encode_block(block):
+    records = np.empty(len(block.patient_ids), dtype=RECORD_DTYPE)
+    records["patient_id"] = block.patient_ids
+    records["time"] = block.times
+    for column, key in enumerate(VITAL_KEYS):
+        records[key] = block.values[:, column]
+    payload = BATCH_HEADER.pack(MAGIC, len(records)) + records.tobytes()
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+# Decodes a payload into a ReadingBlock and the number of rejected records.
+# Malformed payloads raise FrameError; invalid records are dropped.
+def decode_payload(payload, known_patients=None):
+    if len(payload) < BATCH_HEADER.size:
+        raise FrameError("truncated batch header")
+    magic, count = BATCH_HEADER.unpack_from(payload)
+    if magic != MAGIC:
+        raise FrameError(f"bad magic {magic!r}")
+    if len(payload) != BATCH_HEADER.size + count * RECORD_DTYPE.itemsize:
+        raise FrameError(f"payload of {len(payload)} bytes does not hold {count} records")
+    records = np.frombuffer(payload, dtype=RECORD_DTYPE, count=count, offset=BATCH_HEADER.size)
+
+    valid = np.isfinite(records["time"])
+    for vital in VITALS:
+        low, high = vital.valid_range
+        valid &= (records[vital.key] >= low) & (records[vital.key] <= high)
+    if known_patients is not None:
+        valid &= known_patients(records["patient_id"])
+    records = records[valid]
+    values = round_values(np.column_stack([records[key] for key in VITAL_KEYS]))
+    block = ReadingBlock(records["patient_id"].astype(np.int64), records["time"].copy(), values)
+    return block, count - len(records)
+
+class ConnectionStats:
+    def __init__(self, peer, transport):
+        self.peer = peer
+        self.transport = transport
+        self.opened_at = time.monotonic()
+        self.closed_at = None
+        self.frames = 0
+        self.readings = 0
+        self.rejected = 0
+        self.bytes = 0
+        self.errors = 0
+
+    def readings_per_second(self):
+        elapsed = (self.closed_at or time.monotonic()) - self.opened_at
+        return self.readings / max(elapsed, 1e-9)
+
+    def as_dict(self):
+        return {"peer": self.peer, "transport": self.transport, "frames": self.frames, "readings": self.readings,
+                "rejected": self.rejected, "bytes": self.bytes, "errors": self.errors,
+                "readings_per_second": self.readings_per_second(), "open": self.closed_at is None}
+
+# asyncio ingestion gateway for network sensors. Each valid frame is decoded
+# into a ReadingBlock and handed in one call to sink(block, peer); a sink that
+# blocks (e.g. a full queue under the "block" policy) stops the gateway from
+# reading, which pushes back on the devices through TCP flow control.
+class SensorGateway:
+    def __init__(self, sink, host="127.0.0.1", port=9500, udp_port=None, known_patients=None):
+        self.sink = sink
+        self.host = host
+        self.port = port
+        self.udp_port = udp_port
+        self.known_patients = known_patients
+        self.stats = {}
+        self.connections = {}  # writer -> handler task of each open TCP connection
+        self.server = None
+        self.udp_transport = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        if self.udp_port is not None:
+            loop = asyncio.get_running_loop()
+            self.udp_transport, _ = await loop.create_datagram_endpoint(lambda: _DatagramHandler(self), local_addr=(self.host, self.udp_port))
+            self.udp_port = self.udp_transport.get_extra_info("sockname")[1]
+
+    # Open connections are closed first: wait_closed() does not return while
+    # a client is still connected (Python 3.12+), and handlers left pending
+    # would be destroyed with the loop. Closing a writer ends its handler at
+    # the next read; handlers still running after STOP_TIMEOUT are cancelled.
+    async def stop(self):
+        if self.udp_transport is not None:
+            self.udp_transport.close()
+        if self.server is not None:
+            self.server.close()
+            connections = dict(self.connections)
+            for writer in connections:
+                writer.close()
+            if connections:
+                _, pending = await asyncio.wait(connections.values(), timeout=STOP_TIMEOUT)
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+            try:
+                await asyncio.wait_for(self.server.wait_closed(), STOP_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+
+    def connection_stats(self):
+        return [stats.as_dict() for stats in list(self.stats.values())]
+
+    def handle_payload(self, payload, stats):
+        block, rejected = decode_payload(payload, self.known_patients)
+        stats.frames += 1
+        stats.bytes += FRAME_HEADER.size + len(payload)
+        stats.rejected += rejected
+        stats.readings += len(block.patient_ids)
+        if len(block.patient_ids):
+            self.sink(block, stats.peer)
+
+    async def handle_connection(self, reader, writer):
+        peer = "%s:%s" % writer.get_extra_info("peername")[:2]
+        stats = self.stats[peer] = ConnectionStats(peer, "tcp")
+        self.connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                header = await reader.readexactly(FRAME_HEADER.size)
+                (length,) = FRAME_HEADER.unpack(header)
+                if length > MAX_FRAME_BYTES:
+                    raise FrameError(f"frame of {length} bytes exceeds {MAX_FRAME_BYTES}")
+                self.handle_payload(await reader.readexactly(length), stats)
+        except asyncio.IncompleteReadError:
+            pass
+        except FrameError:
+            # The stream cannot be resynchronised after a bad frame
+            stats.errors += 1
+        finally:
+            self.connections.pop(writer, None)
+            stats.closed_at = time.monotonic()
+            writer.close()
+
+class _DatagramHandler(asyncio.DatagramProtocol):
+    def __init__(self, gateway):
+        self.gateway = gateway
+
+    def datagram_received(self, data, addr):
+        peer = "%s:%s" % addr[:2]
+        stats = self.gateway.stats.get(peer)
+        if stats is None:
+            stats = self.gateway.stats[peer] = ConnectionStats(peer, "udp")
+        try:
+            if len(data) < FRAME_HEADER.size or FRAME_HEADER.unpack_from(data)[0] != len(data) - FRAME_HEADER.size:
+                raise FrameError("datagram length does not match its frame header")
+            self.gateway.handle_payload(data[FRAME_HEADER.size:], stats)
+        except FrameError:
+            stats.errors += 1
+
+# Runs a SensorGateway on its own event loop thread
+class GatewayThread(threading.Thread):
+    def __init__(self, gateway):
+        threading.Thread.__init__(self, name="SensorGateway", daemon=True)
+        self.gateway = gateway
+        self.loop = asyncio.new_event_loop()
+        self.started = threading.Event()
+        self.error = None
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.gateway.start())
+        except OSError as e:
+            self.error = e
+            self.started.set()
+            self.loop.close()
+            return
+        self.started.set()
+        self.loop.run_forever()
+        self.loop.run_until_complete(self.gateway.stop())
+        self.loop.close()
+
+    # Safe from any thread once started is set: a stop requested before
+    # run_forever() is queued and ends it on its first iteration
+    def stop(self):
+        try:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        except RuntimeError:
+            pass  # the loop is already closed
+
+# Simulated device for load tests: streams fleet blocks to a gateway over TCP
+# (or UDP, one frame per datagram)
+class SimulatedDevice:
+    def __init__(self, patient_ids, host="127.0.0.1", port=9500, readings_per_patient=1, interval=1.0, seed=None):
+        self.fleet = SensorFleet(patient_ids, seed=seed)
+        self.host = host
+        self.port = port
+        self.readings_per_patient = readings_per_patient
+        self.interval = interval
+        self.sent = 0
+
+    async def run_tcp(self, batches):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            for _ in range(batches):
+                frame = encode_block(self.fleet.tick(self.readings_per_patient))
+                writer.write(frame)
+                await writer.drain()
+                self.sent += (len(frame) - FRAME_HEADER.size - BATCH_HEADER.size) // RECORD_DTYPE.itemsize
+                await asyncio.sleep(self.interval)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    async def run_udp(self, batches):
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(self.host, self.port))
+        try:
+            for _ in range(batches):
+                frame = encode_block(self.fleet.tick(self.readings_per_patient))
+                transport.sendto(frame)
+                self.sent += (len(frame) - FRAME_HEADER.size - BATCH_HEADER.size) // RECORD_DTYPE.itemsize
+                await asyncio.sleep(self.interval)
+        finally:
+            transport.close()
+
+async def run_load_test(host, port, devices, patients_per_device, batches, interval, readings_per_patient=1, udp=False):
+    fleet = [SimulatedDevice(range(i * patients_per_device, (i + 1) * patients_per_device), host, port, readings_per_patient, interval, seed=i)
+             for i in range(devices)]
+    started = time.monotonic()
+    await asyncio.gather(*((device.run_udp if udp else device.run_tcp)(batches) for device in fleet))
+    sent = sum(device.sent for device in fleet)
+    return sent, time.monotonic() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Sensor ingestion gateway and simulated device client")
+    parser.add_argument("mode", choices=("serve", "client"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9500)
+    parser.add_argument("--udp", action="store_true", help="client: send datagrams; serve: also listen on UDP --port")
+    parser.add_argument("--devices", type=int, default=10)
+    parser.add_argument("--patients-per-device", type=int, default=10)
+    parser.add_argument("--readings-per-patient", type=int, default=1)
+    parser.add_argument("--batches", type=int, default=60)
+    parser.add_argument("--interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.mode == "client":
+        sent, elapsed = asyncio.run(run_load_test(args.host, args.port, args.devices, args.patients_per_device, args.batches,
+                                                  args.interval, args.readings_per_patient, args.udp))
+        print(f"Sent {sent} readings in {elapsed:.1f} s ({sent / elapsed:.0f} readings/s)")
+        return
+
+    gateway = SensorGateway(lambda block, peer: None, args.host, args.port, udp_port=args.port if args.udp else None)
+    thread = GatewayThread(gateway)
+    thread.start()
+    thread.started.wait()
+    if thread.error is not None:
+        raise SystemExit(f"Cannot start gateway: {thread.error}")
+    print(f"Gateway listening on {args.host}:{gateway.port}")
+    try:
+        while True:
+            time.sleep(5)
+            for stats in gateway.connection_stats():
+                print(f"{stats['transport']} {stats['peer']}: {stats['readings']} readings, {stats['rejected']} rejected, "
+                      f"{stats['errors']} errors, {stats['readings_per_second']:.0f} readings/s")
+    except KeyboardInterrupt:
+        thread.stop()
+        thread.join(STOP_TIMEOUT + 1.0)
+
+if __name__ == "__main__":
+    main()
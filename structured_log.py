@@ -0,0 +1,68 @@
+import copy
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+
+LOGGER_NAME = "surveillance"
+
+# One compact JSON object per line. Structured values passed as
+# extra={"fields": {...}} are merged into the object.
+class JsonLineFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {"ts": round(record.created, 6), "level": record.levelname, "logger": record.name,
+                 "thread": record.threadName, "msg": record.getMessage()}
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info or record.exc_text:
+            entry["exc"] = record.exc_text or self.formatException(record.exc_info)
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+# Keeps one in `every` routine events (logged with extra={"routine": True});
+# anything else, and anything above INFO, always passes. Runs on the calling
+# thread, so dropped events are never formatted nor queued.
+class SamplingFilter(logging.Filter):
+    def __init__(self, every=100):
+        logging.Filter.__init__(self)
+        self.every = every
+        self.counter = itertools.count()
+
+    def filter(self, record):
+        if not getattr(record, "routine", False) or record.levelno > logging.INFO:
+            return True
+        return next(self.counter) % self.every == 0
+
+# QueueHandler.prepare() formats the whole record into msg (traceback
+# included) and drops exc_info; this one only merges the arguments into msg
+# and keeps the exception, so the handlers behind the listener still get it
+# (the queue is in-process, the record is never pickled)
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+# Routes the application logger through a queue: callers only enqueue the
+# record, and a QueueListener thread writes JSON lines to a rotating file (and
+# WARNING and above, i.e. alerts and errors, to the console). Returns the
+# listener, to be stopped on exit so the queue is flushed.
+def setup_logging(path="surveillance.log", level=logging.INFO, max_bytes=10 * 1024 * 1024, backup_count=5,
+                  sample_every=100, console_level=logging.WARNING):
+    log_queue = queue.SimpleQueue()
+    file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+    file_handler.setFormatter(JsonLineFormatter())
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(console_level)
+    console_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+
+    queue_handler = StructuredQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(sample_every))
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level)
+    logger.handlers = [queue_handler]
+    logger.propagate = False
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    return listener
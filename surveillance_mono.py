@@ -15,9 +15,11 @@ from sklearn.linear_model import LinearRegression
 import numpy as np
 import time
 import queue
+from patient_registry import PatientRegistry
 
-# Dictionary of patients
-patients = {i: f"Patient_{i+1}" for i in range(100)}
+# Registry of patients
+BED_COUNT = 100
+patients = PatientRegistry(BED_COUNT)
 
 # Class for monitoring data and displaying graphs
 class DataMonitor(tk.Frame):
@@ -27,7 +29,7 @@ class DataMonitor(tk.Frame):
         self.selected_patient = tk.StringVar(value="Patient_1")
         self.duration = tk.StringVar(value="30")
 
-        self.patient_selector = ttk.Combobox(self, textvariable=self.selected_patient, values=list(patients.values()))
+        self.patient_selector = ttk.Combobox(self, textvariable=self.selected_patient, values=patients.patient_names())
         self.patient_selector.pack(side=tk.TOP, fill=tk.X, padx=10, pady=10)
         self.patient_selector.bind("<<ComboboxSelected>>", self.on_patient_change)
 
@@ -40,15 +42,15 @@ class DataMonitor(tk.Frame):
         self.fig, self.axs = plt.subplots(3, 1, figsize=(10, 8))
         self.fig.tight_layout(pad=3.0)
 
-        self.timestamps = {i: [] for i in range(100)}
-        self.temperatures = {i: [] for i in range(100)}
-        self.heart_rates = {i: [] for i in range(100)}
-        self.oxygen_levels = {i: [] for i in range(100)}
-        self.alerts = {i: [] for i in range(100)}
+        self.timestamps = {i: [] for i in patients.patient_ids()}
+        self.temperatures = {i: [] for i in patients.patient_ids()}
+        self.heart_rates = {i: [] for i in patients.patient_ids()}
+        self.oxygen_levels = {i: [] for i in patients.patient_ids()}
+        self.alerts = {i: [] for i in patients.patient_ids()}
 
-        self.forecast_temp = {i: [] for i in range(100)}
-        self.forecast_hr = {i: [] for i in range(100)}
-        self.forecast_ox = {i: [] for i in range(100)}
+        self.forecast_temp = {i: [] for i in patients.patient_ids()}
+        self.forecast_hr = {i: [] for i in patients.patient_ids()}
+        self.forecast_ox = {i: [] for i in patients.patient_ids()}
 
         self.line_temp, = self.axs[0].plot([], label="Temperature")
         self.line_hr, = self.axs[1].plot([], label="Heart Rate")
@@ -93,7 +95,7 @@ class DataMonitor(tk.Frame):
         self.canvas.draw()
 
     def update_graph(self):
-        selected_patient_id = list(patients.values()).index(self.selected_patient.get())
+        selected_patient_id = patients.id_of(self.selected_patient.get())
         temp_data = self.temperatures[selected_patient_id]
         hr_data = self.heart_rates[selected_patient_id]
         ox_data = self.oxygen_levels[selected_patient_id]
@@ -187,7 +189,7 @@ class DataMonitor(tk.Frame):
                 cont, ind = line.contains(event)
                 if cont:
                     idx = ind["ind"][0]
-                    selected_patient_id = list(patients.values()).index(self.selected_patient.get())
+                    selected_patient_id = patients.id_of(self.selected_patient.get())
                     timestamp = self.timestamps[selected_patient_id][idx]
                     temp = self.temperatures[selected_patient_id][idx]
                     hr = self.heart_rates[selected_patient_id][idx]
@@ -203,7 +205,7 @@ class DataMonitor(tk.Frame):
         messagebox.showinfo("Data Point Details", details)
 
     def show_history(self):
-        selected_patient_id = list(patients.values()).index(self.selected_patient.get())
+        selected_patient_id = patients.id_of(self.selected_patient.get())
         duration = int(self.duration.get())
         temp_data = self.temperatures[selected_patient_id][-duration:]
         hr_data = self.heart_rates[selected_patient_id][-duration:]
@@ -243,7 +245,7 @@ class DataMonitor(tk.Frame):
                 cont, ind = line.contains(event)
                 if cont:
                     idx = ind["ind"][0]
-                    selected_patient_id = list(patients.values()).index(self.selected_patient.get())
+                    selected_patient_id = patients.id_of(self.selected_patient.get())
                     temp = self.temperatures[selected_patient_id][idx]
                     hr = self.heart_rates[selected_patient_id][idx]
                     ox = self.oxygen_levels[selected_patient_id][idx]
@@ -354,7 +356,7 @@ class Application(tk.Tk):
 
     def run_sequentially(self):
         while self.running:
-            for producer_id in range(100):
+            for producer_id in patients.patient_ids():
                 if not self.running:
                     break
                 self.collect_data(producer_id)
@@ -419,7 +421,7 @@ class Application(tk.Tk):
             self.alert_log.append((patients[producer_id], timestamp, temp, heart_rate, oxygen_level, bp, alert))
 
     def make_forecasts(self):
-        for patient_id in range(100):
+        for patient_id in patients.patient_ids():
             timestamps, temperatures, heart_rates, oxygen_levels = self.data_monitor.get_data(patient_id)
 
             if len(timestamps) >= 2:
@@ -8,139 +8,385 @@ import datetime
 import random
 import os
 import webbrowser
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.enums import TA_CENTER
+import matplotlib
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from multiprocessing import Manager
+from matplotlib.collections import LineCollection
 from sklearn.linear_model import LinearRegression
 import numpy as np
-
-# Shared queue for sensor data
-manager = Manager()
-data_queue = manager.Queue()
-
-# Dictionary of patients
-patients = {i: f"Patient_{i+1}" for i in range(100)}
+from collections import deque
+import logging
+from pipeline_metrics import PipelineMetrics
+from runtime_profiler import RuntimeProfiler
+from reading_queue import SheddingQueue, PartitionedQueues
+from patient_registry import PatientRegistry
+from alert_store import AlertEpisodeIndex, AlertStore
+from alert_report import AlertReportBuilder, AlertExporter
+from sensor_fleet import SensorFleet, ReadingBlock, select_rows
+from sensor_gateway import SensorGateway, GatewayThread
+from anomaly_detector import AnomalyDetector
+from structured_log import LOGGER_NAME, setup_logging
+from vitals import VITALS, VitalSeries, check_critical, check_critical_block, check_thresholds, check_thresholds_block, format_value, round_values
+
+# Bounded queues for sensor data, one partition per consumer; patients are
+# consistent-hashed onto partitions (see SheddingQueue for the policies)
+NUM_CONSUMERS = 10
+QUEUE_CAPACITY = 1000
+QUEUE_POLICY = "drop_oldest"
+data_queue = PartitionedQueues(NUM_CONSUMERS, capacity=QUEUE_CAPACITY, policy=QUEUE_POLICY)
+# Largest block entry, as a fraction of the partition capacity (see route_block)
+BLOCK_ENTRY_FRACTION = 0.1
+
+# Target for a critical reading to be shown in the alert table after it was
+# queued, measured when the table is redrawn (so including its refresh delay)
+ALERT_LATENCY_TARGET = 0.5  # seconds
+
+# Per-stage latency histograms, queue depth and per-thread throughput
+metrics = PipelineMetrics()
+
+# Runtime-toggleable profiler for the producer/consumer/forecaster/GUI paths
+profiler = RuntimeProfiler()
+
+# Pauses the long-lived worker pools between Stop and Start without ending
+# the threads; sleep() returns early as soon as the gate is paused or closed
+class WorkerGate:
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.running = False
+        self.closed = False
+
+    def open(self):
+        with self.condition:
+            self.running = True
+            self.condition.notify_all()
+
+    def pause(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    # Blocks while paused; returns False once the gate is closed
+    def wait_open(self):
+        with self.condition:
+            self.condition.wait_for(lambda: self.running or self.closed)
+            return not self.closed
+
+    # Lets long jobs give up between steps once Stop or close is requested
+    def is_open(self):
+        return self.running and not self.closed
+
+    def sleep(self, seconds):
+        with self.condition:
+            self.condition.wait_for(lambda: not self.running or self.closed, seconds)
+
+# Queued on every partition at shutdown to wake the consumers
+SHUTDOWN = object()
+
+# Readings still queued this long after Stop are discarded
+STOP_DRAIN_TIMEOUT = 3.0  # seconds
+
+# Longest wait for the worker pools to exit when the window is closed
+SHUTDOWN_TIMEOUT = 5.0  # seconds
+
+# Application log, written asynchronously as JSON lines by setup_logging();
+# routine per-reading events are sampled
+log = logging.getLogger(LOGGER_NAME)
+
+# Registry of patients (beds can be admitted and discharged at runtime)
+BED_COUNT = 100
+patients = PatientRegistry(BED_COUNT)
+
+# Producer threads are capped, each one simulates the sensors of a group of beds
+MAX_PRODUCERS = 100
+
+# Load simulation: the vectorized sensor fleet emits a block of readings for
+# every patient each tick
+FLEET_TICK_INTERVAL = 1.0  # seconds
+FLEET_READINGS_PER_PATIENT = 1
+
+# Network sensors send length-prefixed binary batches to the ingestion gateway
+# (see sensor_gateway.py); UDP datagrams are accepted on the same port
+GATEWAY_HOST = "127.0.0.1"
+GATEWAY_PORT = 9500
+
+def format_alert(alert_types, deviations=()):
+    alert = "".join(f"{name} detected! " for name in alert_types)
+    alert += "".join(f"{vital.label} deviation detected! " for vital, deviated in zip(VITALS, deviations) if deviated)
+    return alert
 
 # Producer class for simulating IoT sensor data collection
 class Producer(threading.Thread):
-    def __init__(self, log_widget, stop_event, producer_id):
-        threading.Thread.__init__(self)
+    def __init__(self, log_widget, stop_event, producer_id, patient_ids):
+        threading.Thread.__init__(self, name=f"Producer-{producer_id}")
         self.log_widget = log_widget
         self.stop_event = stop_event
         self.producer_id = producer_id
+        self.patient_ids = list(patient_ids)
 
     def run(self):
+        profiler.register("producer")
         while not self.stop_event.is_set():
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            temperature = random.uniform(36.0, 39.0)
-            heart_rate = random.randint(60, 120)
-            oxygen_level = random.uniform(90.0, 100.0)
-            blood_pressure = (random.randint(90, 140), random.randint(60, 90))
-            item = f"{timestamp}, Temp: {temperature:.2f}, Heart Rate: {heart_rate}, O2: {oxygen_level:.2f}, BP: {blood_pressure[0]}/{blood_pressure[1]}"
-            data_queue.put((self.producer_id, item))
-            self.log_widget.insert(tk.END, f"Producer {self.producer_id} ({patients[self.producer_id]}) added: {item}\n", 'info')
-            self.log_widget.yview(tk.END)
-            print(f"Producer {self.producer_id} ({patients[self.producer_id]}) added: {item}")
-            time.sleep(random.uniform(0.5, 2))  # Simulate random data collection interval
+            with profiler.section():
+                for patient_id in list(self.patient_ids):
+                    self.produce(patient_id)
+            self.stop_event.wait(random.uniform(0.5, 2))  # Simulate random data collection interval
+        profiler.unregister()
+
+    def produce(self, patient_id):
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        values = round_values([random.uniform(*vital.simulated_range) for vital in VITALS]).tolist()
+        item = timestamp + "".join(f", {vital.short}: {format_value(vital, value)}" for vital, value in zip(VITALS, values))
+        critical = check_critical(values)
+        if not self.enqueue(patient_id, item, critical):
+            return
+        metrics.count(self.name)
+        self.log_widget.insert(tk.END, f"Producer {self.producer_id} ({patients[patient_id]}) added: {item}\n", 'info')
+        self.log_widget.yview(tk.END)
+        log.info("Producer %s (%s) added: %s", self.producer_id, patients[patient_id], item,
+                 extra={"routine": True, "fields": {"event": "reading_added", "patient_id": patient_id}})
+
+    # Blocks (interruptibly) under the "block" policy, returns False if shed
+    def enqueue(self, patient_id, item, critical):
+        sequence = patients.next_sequence(patient_id)
+        while not self.stop_event.is_set():
+            try:
+                return data_queue.put(patient_id, (patient_id, item, time.monotonic(), critical, sequence), timeout=1, critical=critical)
+            except queue.Full:
+                continue
+        return False
+
+# Producer feeding the pipeline from a simulated SensorFleet: every tick the
+# block of readings is split per partition, critical rows going to the
+# priority lane, and each part is queued as a single entry
+class FleetProducer(threading.Thread):
+    def __init__(self, log_widget, stop_event, patient_ids, tick_interval=FLEET_TICK_INTERVAL, readings_per_patient=FLEET_READINGS_PER_PATIENT):
+        threading.Thread.__init__(self, name="FleetProducer")
+        self.log_widget = log_widget
+        self.stop_event = stop_event
+        self.tick_interval = tick_interval
+        self.readings_per_patient = readings_per_patient
+        self.fleet = SensorFleet(patient_ids)
+        self.lock = threading.Lock()
+
+    def run(self):
+        profiler.register("producer")
+        while not self.stop_event.is_set():
+            started = time.monotonic()
+            with profiler.section():
+                self.produce()
+            self.stop_event.wait(max(0.0, self.tick_interval - (time.monotonic() - started)))
+        profiler.unregister()
+
+    def set_patients(self, patient_ids):
+        with self.lock:
+            self.fleet.set_patients(patient_ids)
+
+    def produce(self):
+        with self.lock:
+            block = self.fleet.tick(self.readings_per_patient)
+        route_block(block, self.stop_event)
+        metrics.count(self.name, len(block.patient_ids))
+
+# Queues a ReadingBlock on the partitions owning its patients, with the
+# per-patient sequence numbers of its rows. A partition's share is split into
+# entries of at most BLOCK_ENTRY_FRACTION of the partition capacity, so the
+# queue bound holds at fleet scale and shedding drops the oldest readings a
+# chunk at a time.
+def route_block(block, stop_event):
+    patient_ids = block.patient_ids.tolist()
+    partitions = np.fromiter((data_queue.partition_for(patient_id) for patient_id in patient_ids),
+                             dtype=np.int64, count=len(patient_ids))
+    sequences = np.fromiter((patients.next_sequence(patient_id) for patient_id in patient_ids),
+                            dtype=np.int64, count=len(patient_ids))
+    alerting = check_critical_block(block.values)
+    for partition in np.unique(partitions).tolist():
+        in_partition = partitions == partition
+        for critical, mask in ((True, in_partition & alerting), (False, in_partition & ~alerting)):
+            indices = np.flatnonzero(mask)
+            size = max(1, int(data_queue.partitions[partition].capacity * BLOCK_ENTRY_FRACTION))
+            for start in range(0, len(indices), size):
+                chunk = indices[start:start + size]
+                entry = (None, select_rows(block, chunk), time.monotonic(), critical, sequences[chunk])
+                put_block(data_queue.partitions[partition], entry, stop_event)
+
+# Puts one block entry, retrying until stop; under downsampling the queue
+# keeps only some of its rows, cut with select()
+def put_block(partition, entry, stop_event):
+    producer_id, rows, enqueued_at, critical, sequences = entry
+    def select(kept):
+        kept = np.asarray(kept)
+        return producer_id, select_rows(rows, kept), enqueued_at, critical, sequences[kept]
+    keys = rows.patient_ids.tolist()
+    while not stop_event.is_set():
+        try:
+            partition.put(entry, timeout=1, critical=critical, keys=keys, select=select)
+            return
+        except queue.Full:
+            continue
 
 # Consumer class for analyzing sensor data
 class Consumer(threading.Thread):
-    def __init__(self, log_widget, alert_table, stop_event, consumer_id, alert_log, data_monitor):
-        threading.Thread.__init__(self)
+    def __init__(self, log_widget, alert_window, consumer_id, alert_log, data_monitor):
+        threading.Thread.__init__(self, name=f"Consumer-{consumer_id}")
         self.log_widget = log_widget
-        self.alert_table = alert_table
-        self.stop_event = stop_event
+        self.alert_window = alert_window
         self.consumer_id = consumer_id
+        self.queue = data_queue.partitions[consumer_id]
         self.alert_log = alert_log
         self.data_monitor = data_monitor
-
+        # Per-patient baselines of every vital; readings deviating from the
+        # patient's own baseline raise a "Deviation" alert on top of the fixed
+        # thresholds (check_thresholds in vitals.py). A patient always hashes
+        # to the same partition, so each consumer keeps the baselines of its
+        # own patients and no lock is shared between consumers.
+        self.anomaly_detector = AnomalyDetector(vitals=len(VITALS))
+
+    # Consumers outlive Stop/Start: they block on their partition until the
+    # SHUTDOWN sentinel, and mark every entry done so Stop can wait for the
+    # in-flight readings
     def run(self):
-        while not self.stop_event.is_set():
+        profiler.register("consumer")
+        while True:
+            entry = self.queue.get()
             try:
-                producer_id, item = data_queue.get(timeout=1)
-                self.log_widget.insert(tk.END, f"Consumer {self.consumer_id} took from Producer {producer_id} ({patients[producer_id]}): {item}\n", 'info')
-                self.log_widget.yview(tk.END)
-                print(f"Consumer {self.consumer_id} took from Producer {producer_id} ({patients[producer_id]}): {item}")
-                self.process_item(producer_id, item)
-            except queue.Empty:
-                continue
-
-    def process_item(self, producer_id, item):
+                if entry is SHUTDOWN:
+                    break
+                self.handle(*entry)
+            finally:
+                self.queue.task_done()
+        profiler.unregister()
+
+    def handle(self, producer_id, item, enqueued_at, critical, sequence):
+        metrics.observe("queue_wait", time.monotonic() - enqueued_at)
+        # Only the priority lane is held to ALERT_LATENCY_TARGET, so routine
+        # readings that alert are not timed to the alert table
+        alert_enqueued_at = enqueued_at if critical else None
+        if isinstance(item, ReadingBlock):
+            with metrics.time_stage("process_block"), profiler.section():
+                self.process_block(item, alert_enqueued_at, sequence)
+            self.log_widget.insert(tk.END, f"Consumer {self.consumer_id} took a block of {len(item.patient_ids)} readings\n", 'info')
+            self.log_widget.yview(tk.END)
+            metrics.count(self.name, len(item.patient_ids))
+            return
+        # Critical readings skip ahead of the log/print chain so the
+        # alert reaches the table first
+        if not critical:
+            self.log_taken(producer_id, item)
+        with metrics.time_stage("process_item"), profiler.section():
+            self.process_item(producer_id, item, alert_enqueued_at, sequence)
+        if critical:
+            self.log_taken(producer_id, item)
+        metrics.count(self.name)
+
+    def log_taken(self, producer_id, item):
+        self.log_widget.insert(tk.END, f"Consumer {self.consumer_id} took from Producer {producer_id} ({patients[producer_id]}): {item}\n", 'info')
+        self.log_widget.yview(tk.END)
+        log.info("Consumer %s took from Producer %s (%s): %s", self.consumer_id, producer_id, patients[producer_id], item,
+                 extra={"routine": True, "fields": {"event": "reading_taken", "patient_id": producer_id}})
+
+    def process_item(self, producer_id, item, enqueued_at=None, sequence=None):
         data = item.split(", ")
         timestamp = data[0]
-        temp = float(data[1].split(": ")[1])
-        heart_rate = int(data[2].split(": ")[1])
-        oxygen_level = float(data[3].split(": ")[1])
-        bp = tuple(map(int, data[4].split(": ")[1].split("/")))
-        
-        alert = ""
-        if temp > 37.5:
-            alert += "Fever detected! "
-        if heart_rate > 100:
-            alert += "Tachycardia detected! "
-        if oxygen_level < 95.0:
-            alert += "Hypoxia detected! "
-        if bp[0] > 130 or bp[1] > 85:
-            alert += "Hypertension detected! "
-        
+        values = [float(field.split(": ")[1]) for field in data[1:]]
+
+        alert_types = check_thresholds(values)
+        deviations = self.anomaly_detector.update([producer_id], [values])[0]
+        alert = format_alert(alert_types, deviations)
+        if deviations.any():
+            alert_types.append("Deviation")
+
         alert_detected = bool(alert)
-        self.data_monitor.update_data(producer_id, timestamp, temp, heart_rate, oxygen_level, alert_detected)
 
         if alert_detected:
-            alert_message = f"ALERT by Consumer {self.consumer_id} for {patients[producer_id]}: {alert}"
-            self.log_widget.insert(tk.END, alert_message + '\n', 'alert')
-            self.log_widget.yview(tk.END)
-            print(alert_message)
-            alert_id = self.alert_table.insert('', 'end', values=(patients[producer_id], alert))
-            self.alert_table.see(alert_id)
-            self.alert_log.append((patients[producer_id], timestamp, temp, heart_rate, oxygen_level, bp, alert))
+            self.record_alert(producer_id, timestamp, values, alert, alert_types, enqueued_at)
+
+        self.data_monitor.update_data(producer_id, timestamp, values, alert_detected, sequence)
+
+        if alert_detected:
+            self.log_alert(producer_id, alert)
+
+    # Blocks of readings (sensor fleet): the alert rules run on the whole
+    # arrays and the timestamp strings are formatted once per second of data
+    def process_block(self, block, enqueued_at=None, sequences=None):
+        masks = check_thresholds_block(block.values)
+        deviations = self.anomaly_detector.update(block.patient_ids, block.values)
+        masks["Deviation"] = deviations.any(axis=1)
+        alerting = np.logical_or.reduce(list(masks.values()))
+        seconds = np.floor(block.times).astype(np.int64)
+        timestamps = {second: datetime.datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S") for second in np.unique(seconds).tolist()}
+        sequences = [None] * len(block.patient_ids) if sequences is None else sequences.tolist()
+        rows = zip(block.patient_ids.tolist(), seconds.tolist(), block.values, alerting.tolist(), sequences)
+        for row, (patient_id, second, values, alert_detected, sequence) in enumerate(rows):
+            timestamp = timestamps[second]
+            if alert_detected:
+                alert_types = [name for name, mask in masks.items() if mask[row]]
+                alert = format_alert([name for name in alert_types if name != "Deviation"], deviations[row])
+                self.record_alert(patient_id, timestamp, values.tolist(), alert, alert_types, enqueued_at)
+            self.data_monitor.update_data(patient_id, timestamp, values, alert_detected, sequence)
+            if alert_detected:
+                self.log_alert(patient_id, alert)
+
+    def record_alert(self, patient_id, timestamp, values, alert, alert_types, enqueued_at):
+        self.alert_window.record_alert(patients[patient_id], alert, enqueued_at)
+        self.alert_log.add(patients[patient_id], timestamp, values, alert, alert_types)
+
+    def log_alert(self, patient_id, alert):
+        alert_message = f"ALERT by Consumer {self.consumer_id} for {patients[patient_id]}: {alert}"
+        self.log_widget.insert(tk.END, alert_message + '\n', 'alert')
+        self.log_widget.yview(tk.END)
+        log.warning(alert_message, extra={"fields": {"event": "alert", "patient_id": patient_id, "alert": alert.strip()}})
 
 # Forecaster class for predicting health trends
 class Forecaster(threading.Thread):
-    def __init__(self, log_widget, stop_event, data_monitor, forecast_interval=10):
-        threading.Thread.__init__(self)
+    def __init__(self, log_widget, gate, data_monitor, forecast_interval=10, forecaster_id=0):
+        threading.Thread.__init__(self, name=f"Forecaster-{forecaster_id}")
         self.log_widget = log_widget
-        self.stop_event = stop_event
+        self.gate = gate
         self.data_monitor = data_monitor
         self.forecast_interval = forecast_interval
 
     def run(self):
-        while not self.stop_event.is_set():
-            self.make_forecasts()
-            time.sleep(self.forecast_interval)
+        profiler.register("forecaster")
+        while self.gate.wait_open():
+            with metrics.time_stage("forecast_cycle"), profiler.section():
+                self.make_forecasts()
+            metrics.count(self.name)
+            self.gate.sleep(self.forecast_interval)
+        profiler.unregister()
 
     def make_forecasts(self):
-        for patient_id in range(100):
-            timestamps, temperatures, heart_rates, oxygen_levels = self.data_monitor.get_data(patient_id)
+        for patient_id, snapshot in self.data_monitor.snapshot_all().items():
+            if not self.gate.is_open():
+                return
+            timestamps, values = snapshot.timestamps, snapshot.values
 
             if len(timestamps) >= 2:
                 try:
-                    future_timestamps = np.array(range(len(timestamps), len(timestamps) + 10)).reshape(-1, 1)
-
-                    temp_model = LinearRegression().fit(np.array(range(len(timestamps))).reshape(-1, 1), temperatures)
-                    temp_forecast = temp_model.predict(future_timestamps)
-
-                    hr_model = LinearRegression().fit(np.array(range(len(timestamps))).reshape(-1, 1), heart_rates)
-                    hr_forecast = hr_model.predict(future_timestamps)
+                    # One multi-output regression fits every vital at once
+                    steps = np.arange(len(timestamps)).reshape(-1, 1)
+                    future_steps = np.arange(len(timestamps), len(timestamps) + 10).reshape(-1, 1)
+                    forecast = LinearRegression().fit(steps, values).predict(future_steps)
 
-                    ox_model = LinearRegression().fit(np.array(range(len(timestamps))).reshape(-1, 1), oxygen_levels)
-                    ox_forecast = ox_model.predict(future_timestamps)
+                    self.data_monitor.update_forecasts(patient_id, forecast)
 
-                    self.data_monitor.update_forecasts(patient_id, temp_forecast, hr_forecast, ox_forecast)
-
-                    forecast_message = f"Forecast for {patients[patient_id]} - Temp: {temp_forecast[-1]:.2f}, HR: {hr_forecast[-1]:.2f}, O2: {ox_forecast[-1]:.2f}"
+                    forecast_message = f"Forecast for {patients[patient_id]} - " + ", ".join(
+                        f"{vital.short}: {value:.2f}" for vital, value in zip(VITALS, forecast[-1]))
                     self.log_widget.insert(tk.END, forecast_message + '\n', 'forecast')
                     self.log_widget.yview(tk.END)
-                    print(forecast_message)
+                    log.info(forecast_message, extra={"fields": {"event": "forecast", "patient_id": patient_id}})
                 except Exception as e:
                     self.log_widget.insert(tk.END, f"Error forecasting for {patients[patient_id]}: {str(e)}\n", 'error')
                     self.log_widget.yview(tk.END)
-                    print(f"Error forecasting for {patients[patient_id]}: {str(e)}")
+                    log.exception("Error forecasting for %s", patients[patient_id], extra={"fields": {"event": "forecast_error", "patient_id": patient_id}})
+
+# Readings kept per patient, and the chart grid (two charts per row, one per vital)
+HISTORY_SIZE = 100
+CHART_ROWS = -(-len(VITALS) // 2)
 
 class DataMonitor(tk.Frame):
     def __init__(self, parent):
@@ -149,7 +395,7 @@ class DataMonitor(tk.Frame):
         self.selected_patient = tk.StringVar(value="Patient_1")
         self.duration = tk.StringVar(value="30")
 
-        self.patient_selector = ttk.Combobox(self, textvariable=self.selected_patient, values=list(patients.values()))
+        self.patient_selector = ttk.Combobox(self, textvariable=self.selected_patient, values=patients.patient_names())
         self.patient_selector.pack(side=tk.TOP, fill=tk.X, padx=10, pady=10)
         self.patient_selector.bind("<<ComboboxSelected>>", self.on_patient_change)
 
@@ -159,32 +405,45 @@ class DataMonitor(tk.Frame):
         self.duration_entry = tk.Entry(self, textvariable=self.duration)
         self.duration_entry.pack(side=tk.TOP, fill=tk.X, padx=10, pady=10)
 
-        self.fig, self.axs = plt.subplots(3, 1, figsize=(10, 8))
+        self.fig, axs = plt.subplots(CHART_ROWS, 2, figsize=(10, 8))
+        self.axs = list(axs.flat[:len(VITALS)])
+        for ax in axs.flat[len(VITALS):]:
+            ax.set_visible(False)
         self.fig.tight_layout(pad=3.0)
 
-        self.timestamps = {i: [] for i in range(100)}
-        self.temperatures = {i: [] for i in range(100)}
-        self.heart_rates = {i: [] for i in range(100)}
-        self.oxygen_levels = {i: [] for i in range(100)}
-        self.alerts = {i: [] for i in range(100)}
-
-        self.forecast_temp = {i: [] for i in range(100)}
-        self.forecast_hr = {i: [] for i in range(100)}
-        self.forecast_ox = {i: [] for i in range(100)}
-
-        self.line_temp, = self.axs[0].plot([], label="Temperature")
-        self.line_hr, = self.axs[1].plot([], label="Heart Rate")
-        self.line_ox, = self.axs[2].plot([], label="Oxygen Level")
-
-        self.forecast_line_temp, = self.axs[0].plot([], label="Forecast Temp", linestyle='--')
-        self.forecast_line_hr, = self.axs[1].plot([], label="Forecast HR", linestyle='--')
-        self.forecast_line_ox, = self.axs[2].plot([], label="Forecast O2", linestyle='--')
-
-        self.axs[0].set_title('Temperature')
-        self.axs[1].set_title('Heart Rate')
-        self.axs[2].set_title('Oxygen Level')
-
-        for ax in self.axs:
+        # One VitalSeries (contiguous rows x vitals array) per patient; readers
+        # use the SeriesSnapshot it publishes (versioned, read-only)
+        self.series = {}
+        self.drawn_key = None
+
+        # Patients with readings not yet picked up by the ward overview
+        self.dirty_patients = set()
+        self.dirty_lock = threading.Lock()
+
+        for patient_id in patients.patient_ids():
+            self.add_patient(patient_id)
+        patients.subscribe(self.on_registry_change)
+
+        # The artists are created once (one chart per vital) and updated in
+        # place by draw_graph
+        self.lines = [ax.plot([], label=vital.label, color='blue')[0] for ax, vital in zip(self.axs, VITALS)]
+        self.point_sets = [ax.scatter([], [], color='blue') for ax in self.axs]
+        self.forecast_lines = [ax.plot([], label=f"Forecast {vital.short}", linestyle='--', color='green')[0] for ax, vital in zip(self.axs, VITALS)]
+
+        # Non-modal hover tooltips, one per chart
+        self.tooltips = [ax.annotate("", xy=(0, 0), xytext=(12, 12), textcoords="offset points", visible=False,
+                                     bbox=dict(boxstyle="round", fc="#ffffe0", alpha=0.9), fontsize=8)
+                         for ax in self.axs]
+        self.tooltip_key = None
+        self.last_hover = 0.0
+        self.hover_interval = 1 / 60  # handle at most 60 motion events per second
+        self.hover_radius = 8  # pixels
+        self.plotted_rows = self.empty_rows()
+        self.history_rows = self.empty_rows()
+        self.history_axes = []
+
+        for ax, vital in zip(self.axs, VITALS):
+            ax.set_title(f"{vital.label} ({vital.unit})")
             ax.set_xlim(0, 60)
             ax.legend()
 
@@ -194,164 +453,207 @@ class DataMonitor(tk.Frame):
 
         self.canvas.mpl_connect('motion_notify_event', self.on_hover)
 
-        self.update_interval = 1000  # 1 second
+        profiler.register("gui")
+        # The refresh loop runs every min_update_interval while the selected
+        # patient's data changes and backs off to max_update_interval when idle
+        self.min_update_interval = 250
+        self.max_update_interval = 1000  # 1 second
+        self.update_interval = self.max_update_interval
         self.update_graph()
 
+    @staticmethod
+    def empty_rows():
+        return [], np.empty((0, len(VITALS))), []
+
+    def add_patient(self, patient_id):
+        self.series[patient_id] = VitalSeries(HISTORY_SIZE)
+
+    def remove_patient(self, patient_id):
+        self.series.pop(patient_id, None)
+
+    def on_registry_change(self, event, patient_id):
+        if event == "admit":
+            self.add_patient(patient_id)
+        else:
+            self.remove_patient(patient_id)
+        self.patient_selector.config(values=patients.patient_names())
+
+    def selected_patient_id(self):
+        return patients.id_of(self.selected_patient.get())
+
+    def current_key(self):
+        patient_id = self.selected_patient_id()
+        series = self.series.get(patient_id)
+        return (patient_id, series.snapshot.version if series is not None else None)
+
     def on_patient_change(self, event):
         self.patient_label.config(text=f"Selected Patient: {self.selected_patient.get()}")
         self.clear_data()
-        self.update_graph()
+        key = self.current_key()
+        with metrics.time_stage("update_graph"), profiler.section():
+            self.draw_graph()
+        self.drawn_key = key
 
     def clear_data(self):
-        self.line_temp.set_data([], [])
-        self.line_hr.set_data([], [])
-        self.line_ox.set_data([], [])
-        self.forecast_line_temp.set_data([], [])
-        self.forecast_line_hr.set_data([], [])
-        self.forecast_line_ox.set_data([], [])
+        for line, points, forecast_line in zip(self.lines, self.point_sets, self.forecast_lines):
+            line.set_data([], [])
+            points.set_offsets(np.empty((0, 2)))
+            forecast_line.set_data([], [])
+        self.plotted_rows = self.empty_rows()
+        self.hide_tooltip()
         for ax in self.axs:
             ax.relim()
             ax.autoscale_view()
         self.canvas.draw()
 
     def update_graph(self):
-        selected_patient_id = list(patients.values()).index(self.selected_patient.get())
-        temp_data = self.temperatures[selected_patient_id]
-        hr_data = self.heart_rates[selected_patient_id]
-        ox_data = self.oxygen_levels[selected_patient_id]
-        alert_data = self.alerts[selected_patient_id]
-        timestamps = self.timestamps[selected_patient_id]
-
-        forecast_temp = self.forecast_temp[selected_patient_id]
-        forecast_hr = self.forecast_hr[selected_patient_id]
-        forecast_ox = self.forecast_ox[selected_patient_id]
-
-        if len(temp_data) > 60:
-            temp_data = temp_data[-60:]
-            hr_data = hr_data[-60:]
-            ox_data = ox_data[-60:]
-            alert_data = alert_data[-60:]
-            timestamps = timestamps[-60:]
-
-        self.line_temp.set_ydata(temp_data)
-        self.line_temp.set_xdata(range(len(temp_data)))
-
-        self.line_hr.set_ydata(hr_data)
-        self.line_hr.set_xdata(range(len(hr_data)))
-
-        self.line_ox.set_ydata(ox_data)
-        self.line_ox.set_xdata(range(len(ox_data)))
-
-        self.forecast_line_temp.set_ydata(forecast_temp)
-        self.forecast_line_temp.set_xdata(range(len(temp_data), len(temp_data) + len(forecast_temp)))
-
-        self.forecast_line_hr.set_ydata(forecast_hr)
-        self.forecast_line_hr.set_xdata(range(len(hr_data), len(hr_data) + len(forecast_hr)))
-
-        self.forecast_line_ox.set_ydata(forecast_ox)
-        self.forecast_line_ox.set_xdata(range(len(ox_data), len(ox_data) + len(forecast_ox)))
+        # Read the version before drawing so a reading that lands mid-draw
+        # triggers another frame
+        key = self.current_key()
+        if key != self.drawn_key:
+            with metrics.time_stage("update_graph"), profiler.section():
+                self.draw_graph()
+            self.drawn_key = key
+            self.update_interval = self.min_update_interval
+        else:
+            metrics.increment("graph_frames_skipped")
+            self.update_interval = min(self.update_interval * 2, self.max_update_interval)
+        self.after(self.update_interval, self.update_graph)
 
-        for ax in self.axs:
+    def draw_graph(self):
+        series = self.series.get(self.selected_patient_id())
+        if series is None:
+            return
+        snapshot = series.snapshot
+        # Snapshot views are immutable, so the hover lookup never sees data
+        # mutated by consumers
+        self.plotted_rows = timestamps, values, alert_data = snapshot.rows(60)
+        forecast = snapshot.forecast
+        self.hide_tooltip(redraw=False)
+
+        point_colors = ['red' if alert else 'blue' for alert in alert_data]
+        x = np.arange(len(values))
+        for column, (ax, line, points, forecast_line) in enumerate(zip(self.axs, self.lines, self.point_sets, self.forecast_lines)):
+            data = values[:, column]
+            line.set_data(x, data)
+            points.set_offsets(np.column_stack((x, data)))
+            points.set_color(point_colors)
+            forecast_line.set_data(np.arange(len(data), len(data) + len(forecast)), forecast[:, column])
             ax.relim()
             ax.autoscale_view()
 
-        self.axs[0].clear()
-        self.axs[1].clear()
-        self.axs[2].clear()
-
-        self.axs[0].plot(temp_data, label="Temperature", color='blue')
-        self.axs[0].scatter(range(len(temp_data)), temp_data, color=['red' if alert else 'blue' for alert in alert_data])
-        self.axs[0].plot(range(len(temp_data), len(temp_data) + len(forecast_temp)), forecast_temp, linestyle='--', color='green', label="Forecast Temp")
-        self.axs[0].set_title('Temperature')
-        self.axs[0].legend()
-
-        self.axs[1].plot(hr_data, label="Heart Rate", color='blue')
-        self.axs[1].scatter(range(len(hr_data)), hr_data, color=['red' if alert else 'blue' for alert in alert_data])
-        self.axs[1].plot(range(len(hr_data), len(hr_data) + len(forecast_hr)), forecast_hr, linestyle='--', color='green', label="Forecast HR")
-        self.axs[1].set_title('Heart Rate')
-        self.axs[1].legend()
-
-        self.axs[2].plot(ox_data, label="Oxygen Level", color='blue')
-        self.axs[2].scatter(range(len(ox_data)), ox_data, color=['red' if alert else 'blue' for alert in alert_data])
-        self.axs[2].plot(range(len(ox_data), len(ox_data) + len(forecast_ox)), forecast_ox, linestyle='--', color='green', label="Forecast O2")
-        self.axs[2].set_title('Oxygen Level')
-        self.axs[2].legend()
-
         self.canvas.draw()
 
-        self.after(self.update_interval, self.update_graph)
-
-    def update_data(self, producer_id, timestamp, temperature, heart_rate, oxygen_level, alert_detected):
-        self.timestamps[producer_id].append(timestamp)
-        self.temperatures[producer_id].append(temperature)
-        self.heart_rates[producer_id].append(heart_rate)
-        self.oxygen_levels[producer_id].append(oxygen_level)
-        self.alerts[producer_id].append(alert_detected)
-
-        if len(self.timestamps[producer_id]) > 100:
-            self.timestamps[producer_id] = self.timestamps[producer_id][-100:]
-            self.temperatures[producer_id] = self.temperatures[producer_id][-100:]
-            self.heart_rates[producer_id] = self.heart_rates[producer_id][-100:]
-            self.oxygen_levels[producer_id] = self.oxygen_levels[producer_id][-100:]
-            self.alerts[producer_id] = self.alerts[producer_id][-100:]
-
-    def update_forecasts(self, patient_id, forecast_temp, forecast_hr, forecast_ox):
-        self.forecast_temp[patient_id] = forecast_temp
-        self.forecast_hr[patient_id] = forecast_hr
-        self.forecast_ox[patient_id] = forecast_ox
-
-    def get_data(self, patient_id):
-        return (self.timestamps[patient_id], self.temperatures[patient_id], self.heart_rates[patient_id], self.oxygen_levels[patient_id])
+    # Each patient is only written by the consumer owning its partition. A
+    # critical reading may overtake the patient's queued routine readings, so
+    # late readings are inserted by sequence number to keep history in order.
+    def update_data(self, producer_id, timestamp, values, alert_detected, sequence=None):
+        series = self.series.get(producer_id)
+        if series is None:  # discharged while the reading was in flight
+            return
+        series.insert(timestamp, values, alert_detected, sequence)
+
+        with self.dirty_lock:
+            self.dirty_patients.add(producer_id)
+
+    def pop_dirty_patients(self):
+        with self.dirty_lock:
+            dirty, self.dirty_patients = self.dirty_patients, set()
+        return dirty
+
+    # forecast: (steps x vitals) array
+    def update_forecasts(self, patient_id, forecast):
+        series = self.series.get(patient_id)
+        if series is None:
+            return
+        series.set_forecast(forecast)
+
+    # (timestamps, values, alerts) of the patient's history, values being a
+    # (rows x vitals) array; read-only views, no copy
+    def get_data(self, patient_id, limit=None):
+        series = self.series.get(patient_id)
+        return series.rows(limit) if series is not None else self.empty_rows()
+
+    # Latest snapshot of every patient. Each one is published by its series
+    # under the series lock, so versions never go backwards; reading them
+    # blocks no writer and copies no patient data.
+    def snapshot_all(self):
+        return {patient_id: series.snapshot for patient_id, series in self.series.copy().items()}
+
+    # Points are plotted at x = 0, 1, 2..., so the candidate under the cursor is
+    # found by rounding xdata (O(1), no per-line contains()) and accepted when
+    # it lies within hover_radius pixels of the cursor
+    def nearest_point(self, ax, values, event):
+        if event.xdata is None or not len(values):
+            return None
+        idx = int(round(event.xdata))
+        if not 0 <= idx < len(values):
+            return None
+        px, py = ax.transData.transform((idx, values[idx]))
+        if (px - event.x) ** 2 + (py - event.y) ** 2 > self.hover_radius ** 2:
+            return None
+        return idx
+
+    def format_details(self, rows, idx):
+        timestamps, values, alerts = rows
+        alert_status = "Alert" if alerts[idx] else "Normal"
+        details = "".join(f"\n{vital.label}: {format_value(vital, value)}" for vital, value in zip(VITALS, values[idx]))
+        return f"Time: {timestamps[idx]}{details}\nStatus: {alert_status}"
 
     def on_hover(self, event):
-        if event.inaxes in self.axs:
-            for line in [self.line_temp, self.line_hr, self.line_ox]:
-                cont, ind = line.contains(event)
-                if cont:
-                    idx = ind["ind"][0]
-                    selected_patient_id = list(patients.values()).index(self.selected_patient.get())
-                    timestamp = self.timestamps[selected_patient_id][idx]
-                    temp = self.temperatures[selected_patient_id][idx]
-                    hr = self.heart_rates[selected_patient_id][idx]
-                    ox = self.oxygen_levels[selected_patient_id][idx]
-                    alert = self.alerts[selected_patient_id][idx]
-                    alert_status = "Alert" if alert else "Normal"
-
-                    details = f"Time: {timestamp}\nTemp: {temp}\nHeart Rate: {hr}\nOxygen: {ox}\nStatus: {alert_status}"
-                    self.show_details(details)
-                    break
+        now = time.monotonic()
+        if now - self.last_hover < self.hover_interval:
+            return
+        self.last_hover = now
+        if event.inaxes not in self.axs:
+            self.hide_tooltip()
+            return
+        axis = self.axs.index(event.inaxes)
+        values = self.plotted_rows[1][:, axis]
+        idx = self.nearest_point(event.inaxes, values, event)
+        if idx is None:
+            self.hide_tooltip()
+            return
+        if self.tooltip_key == (axis, idx):
+            return
+        self.hide_tooltip(redraw=False)
+        tooltip = self.tooltips[axis]
+        tooltip.xy = (idx, values[idx])
+        tooltip.set_text(self.format_details(self.plotted_rows, idx))
+        tooltip.set_visible(True)
+        self.tooltip_key = (axis, idx)
+        self.canvas.draw_idle()
+
+    def hide_tooltip(self, redraw=True):
+        if self.tooltip_key is None:
+            return
+        self.tooltips[self.tooltip_key[0]].set_visible(False)
+        self.tooltip_key = None
+        if redraw:
+            self.canvas.draw_idle()
 
     def show_details(self, details):
         messagebox.showinfo("Data Point Details", details)
 
     def show_history(self):
-        selected_patient_id = list(patients.values()).index(self.selected_patient.get())
+        selected_patient_id = self.selected_patient_id()
+        if selected_patient_id not in self.series:
+            return
         duration = int(self.duration.get())
-        temp_data = self.temperatures[selected_patient_id][-duration:]
-        hr_data = self.heart_rates[selected_patient_id][-duration:]
-        ox_data = self.oxygen_levels[selected_patient_id][-duration:]
-        alert_data = self.alerts[selected_patient_id][-duration:]
-        timestamps = self.timestamps[selected_patient_id][-duration:]
+        self.history_rows = timestamps, values, alert_data = self.get_data(selected_patient_id, duration)
 
-        fig, axs = plt.subplots(3, 1, figsize=(10, 8))
+        fig, axs = plt.subplots(CHART_ROWS, 2, figsize=(10, 8))
+        self.history_axes = list(axs.flat[:len(VITALS)])
+        for ax in axs.flat[len(VITALS):]:
+            ax.set_visible(False)
         fig.tight_layout(pad=3.0)
 
-        axs[0].plot(temp_data, label="Temperature", color='blue')
-        axs[0].scatter(range(len(temp_data)), temp_data, color=['red' if alert else 'blue' for alert in alert_data])
-        axs[0].set_title('Temperature')
-        axs[0].legend()
-
-        axs[1].plot(hr_data, label="Heart Rate", color='blue')
-        axs[1].scatter(range(len(hr_data)), hr_data, color=['red' if alert else 'blue' for alert in alert_data])
-        axs[1].set_title('Heart Rate')
-        axs[1].legend()
-
-        axs[2].plot(ox_data, label="Oxygen Level", color='blue')
-        axs[2].scatter(range(len(ox_data)), ox_data, color=['red' if alert else 'blue' for alert in alert_data])
-        axs[2].set_title('Oxygen Level')
-        axs[2].legend()
-
-        for ax in axs:
+        point_colors = ['red' if alert else 'blue' for alert in alert_data]
+        for column, (ax, vital) in enumerate(zip(self.history_axes, VITALS)):
+            ax.plot(values[:, column], label=vital.label, color='blue')
+            ax.scatter(range(len(values)), values[:, column], color=point_colors)
+            ax.set_title(f"{vital.label} ({vital.unit})")
+            ax.legend()
             ax.set_xticklabels([])
 
         self.history_canvas.figure = fig
@@ -360,22 +662,11 @@ class DataMonitor(tk.Frame):
         self.history_canvas.mpl_connect('button_press_event', self.on_click)
 
     def on_click(self, event):
-        if event.inaxes:
-            for line in event.inaxes.lines:
-                cont, ind = line.contains(event)
-                if cont:
-                    idx = ind["ind"][0]
-                    selected_patient_id = list(patients.values()).index(self.selected_patient.get())
-                    temp = self.temperatures[selected_patient_id][idx]
-                    hr = self.heart_rates[selected_patient_id][idx]
-                    ox = self.oxygen_levels[selected_patient_id][idx]
-                    timestamp = self.timestamps[selected_patient_id][idx]
-                    alert = self.alerts[selected_patient_id][idx]
-                    alert_status = "Alert" if alert else "Normal"
-
-                    details = f"Time: {timestamp}\nTemp: {temp}\nHeart Rate: {hr}\nOxygen: {ox}\nStatus: {alert_status}"
-                    self.show_details(details)
-                    break
+        if event.inaxes in self.history_axes:
+            axis = self.history_axes.index(event.inaxes)
+            idx = self.nearest_point(event.inaxes, self.history_rows[1][:, axis], event)
+            if idx is not None:
+                self.show_details(self.format_details(self.history_rows, idx))
 
     def open_history_window(self):
         history_window = tk.Toplevel(self)
@@ -387,33 +678,309 @@ class DataMonitor(tk.Frame):
 
         self.show_history()
 
-# Class for the alert window
+# Class for the ward overview: every patient gets a cell with sparklines of
+# all vitals over a status background. All cells share one image (status)
+# and one LineCollection per vital, and only the cells of patients with new
+# readings are recomputed on refresh.
+class WardOverview(tk.Toplevel):
+    SPARK_POINTS = 30
+
+    def __init__(self, master, data_monitor, alert_store):
+        tk.Toplevel.__init__(self, master)
+        self.title("Ward Overview")
+        self.geometry("900x700")
+        self.configure(bg="#282c34")
+        self.data_monitor = data_monitor
+        self.alert_store = alert_store
+
+        self.fig = plt.Figure(figsize=(9, 7), facecolor="#282c34")
+        self.ax = self.fig.add_axes((0.01, 0.01, 0.98, 0.94))
+        self.ax.set_axis_off()
+        self.title_text = self.fig.suptitle("", color="#ffffff")
+        status_colors = matplotlib.colors.ListedColormap(['#1c1f24', '#2c313a', '#5c2b2e'])
+        self.image = self.ax.imshow(np.zeros((1, 1)), cmap=status_colors, vmin=0, vmax=2, interpolation='nearest', aspect='auto')
+        self.collections = [LineCollection([], colors=vital.color, linewidths=0.8) for vital in VITALS]
+        for collection in self.collections:
+            self.ax.add_collection(collection)
+        self.tooltip = self.ax.annotate("", xy=(0, 0), xytext=(12, 12), textcoords="offset points", visible=False,
+                                        bbox=dict(boxstyle="round", fc="#ffffe0", alpha=0.9), fontsize=8)
+
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
+        self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+        self.canvas.mpl_connect('motion_notify_event', self.on_hover)
+
+        self.layout_dirty = True
+        patients.subscribe(self.on_registry_change)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.refresh_interval = 2000  # 2 seconds
+        self.refresh()
+
+    def close(self):
+        patients.unsubscribe(self.on_registry_change)
+        self.after_cancel(self.refresh_job)
+        self.destroy()
+
+    def on_registry_change(self, event, patient_id):
+        self.layout_dirty = True
+
+    def build_layout(self):
+        self.patient_ids = patients.patient_ids()
+        count = max(len(self.patient_ids), 1)
+        self.columns = int(np.ceil(np.sqrt(count * 4 / 3)))
+        self.rows = int(np.ceil(count / self.columns))
+        self.cells = {patient_id: cell for cell, patient_id in enumerate(self.patient_ids)}
+        self.status = np.zeros((self.rows, self.columns))
+        self.segments = [[np.empty((0, 2))] * len(self.patient_ids) for _ in VITALS]
+        self.image.set_extent((0, self.columns, self.rows, 0))
+        self.ax.set_xlim(0, self.columns)
+        self.ax.set_ylim(self.rows, 0)
+        self.layout_dirty = False
+
+    # Sparklines of one cell: each vital gets an equal band of the cell
+    # height, scaled to its fixed display range
+    def update_cell(self, patient_id):
+        cell = self.cells[patient_id]
+        row, column = divmod(cell, self.columns)
+        _, values, alerts = self.data_monitor.get_data(patient_id, self.SPARK_POINTS)
+        if len(values):
+            x = column + 0.05 + 0.9 * np.arange(len(values)) / (self.SPARK_POINTS - 1)
+            for index, vital in enumerate(VITALS):
+                low, high = vital.display_range
+                scaled = np.clip((values[:, index] - low) / (high - low), 0.0, 1.0)
+                y = row + (index + 0.9) / len(VITALS) - 0.8 * scaled / len(VITALS)
+                self.segments[index][cell] = np.column_stack((x, y))
+        self.status[row, column] = (2 if alerts[-1] else 1) if len(alerts) else 0
+
+    def refresh(self):
+        dirty = self.data_monitor.pop_dirty_patients()
+        if self.layout_dirty:
+            self.build_layout()
+            dirty = self.patient_ids
+        dirty = [patient_id for patient_id in dirty if patient_id in self.cells]
+        if dirty:
+            for patient_id in dirty:
+                self.update_cell(patient_id)
+            for collection, segments in zip(self.collections, self.segments):
+                collection.set_segments(segments)
+            self.image.set_data(self.status)
+            self.title_text.set_text(f"{len(self.patient_ids)} patients - {int((self.status == 2).sum())} alerting on last reading")
+            self.canvas.draw_idle()
+        self.refresh_job = self.after(self.refresh_interval, self.refresh)
+
+    def on_hover(self, event):
+        if event.inaxes is not self.ax or event.xdata is None:
+            if self.tooltip.get_visible():
+                self.tooltip.set_visible(False)
+                self.canvas.draw_idle()
+            return
+        cell = int(event.ydata) * self.columns + int(event.xdata)
+        if not 0 <= cell < len(self.patient_ids):
+            return
+        patient_id = self.patient_ids[cell]
+        timestamps, values, _ = self.data_monitor.get_data(patient_id, 1)
+        if len(timestamps):
+            details = f"{patients[patient_id]}\nTime: {timestamps[-1]}" + "".join(
+                f"\n{vital.label}: {format_value(vital, value)}" for vital, value in zip(VITALS, values[-1]))
+        else:
+            details = f"{patients[patient_id]}\nNo data"
+        details += f"\nAlerts, last 10 min: {self.alert_store.count_since(patients[patient_id], time.time() - 600)}"
+        self.tooltip.xy = (event.xdata, event.ydata)
+        self.tooltip.set_text(details)
+        self.tooltip.set_visible(True)
+        self.canvas.draw_idle()
+
+# Class for the alert window. Alerts are collapsed into episodes by an
+# AlertEpisodeIndex and the table only holds the rows that fit on screen: the
+# row items are created once (with their stripe tag) and refilled from the
+# index when it changes or the view is scrolled.
 class AlertWindow(tk.Toplevel):
-    def __init__(self, master):
+    EPISODE_GAP = 60.0  # seconds without the alert before a new episode starts
+    ROW_HEIGHT = 20  # pixels, ttk.Treeview default
+
+    def __init__(self, master, alert_store):
         tk.Toplevel.__init__(self, master)
         self.title("Alert Table")
         self.geometry("600x400")
         self.configure(bg="#282c34")
-        
-        self.alert_table = ttk.Treeview(self, columns=("Patient", "Alert"), show='headings', selectmode="browse")
-        self.alert_table.heading("Patient", text="Patient")
-        self.alert_table.heading("Alert", text="Alert")
-        self.alert_table.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-        self.alert_table.column("Patient", width=150)
-        self.alert_table.column("Alert", width=450)
+        self.alert_store = alert_store
+        self.summary_label = tk.Label(self, text="", bg="#282c34", fg="#ffffff", font=("Helvetica", 10), anchor="w", justify=tk.LEFT)
+        self.summary_label.pack(side=tk.TOP, fill=tk.X, padx=10, pady=(10, 0))
+
+        self.episodes = AlertEpisodeIndex(gap=self.EPISODE_GAP)
+        self.offset = 0
+        self.rows = []
+        self.rendered = None
+        # Queue times of the critical alerts recorded since the last redraw;
+        # the sensor-to-alert latency is taken once the table shows them
+        self.pending_latency = deque()
+
+        columns = ("Patient", "Alert", "First seen", "Last seen", "Count")
+        self.alert_table = ttk.Treeview(self, columns=columns, show='headings', selectmode="browse")
+        for column in columns:
+            self.alert_table.heading(column, text=column)
+        self.alert_table.column("Patient", width=100)
+        self.alert_table.column("Alert", width=260)
+        self.alert_table.column("First seen", width=80)
+        self.alert_table.column("Last seen", width=80)
+        self.alert_table.column("Count", width=50)
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y, pady=10)
+        self.alert_table.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
         self.alert_table.tag_configure('oddrow', background='#1c1f24')
         self.alert_table.tag_configure('evenrow', background='#2c313a')
-        
-        self.alert_table.bind("<Configure>", self.adjust_row_colors)
 
-    def adjust_row_colors(self, event):
-        for i, item in enumerate(self.alert_table.get_children()):
-            if i % 2 == 0:
-                self.alert_table.item(item, tags=('evenrow',))
+        self.alert_table.bind("<Configure>", self.resize_rows)
+        self.alert_table.bind("<MouseWheel>", lambda event: self.scroll_by(-1 if event.delta > 0 else 1))
+        self.alert_table.bind("<Button-4>", lambda event: self.scroll_by(-1))
+        self.alert_table.bind("<Button-5>", lambda event: self.scroll_by(1))
+
+        self.refresh_interval = 250
+        self.summary_window = 600  # seconds covered by the summary line
+        self.summary_interval = 2000
+        self.refresh()
+        self.refresh_summary()
+
+    # Called from the consumers; enqueued_at is given for critical readings
+    def record_alert(self, patient_name, alert, enqueued_at=None):
+        self.episodes.record(patient_name, alert, time.time())
+        if enqueued_at is not None:
+            self.pending_latency.append(enqueued_at)
+
+    # Creates or deletes row items at the end only, so resizing is
+    # proportional to the visible rows and not to the number of alerts
+    def resize_rows(self, event):
+        wanted = max(1, event.height // self.ROW_HEIGHT - 1)
+        while len(self.rows) < wanted:
+            tag = 'evenrow' if len(self.rows) % 2 == 0 else 'oddrow'
+            self.rows.append(self.alert_table.insert('', 'end', values=("",) * 5, tags=(tag,)))
+        while len(self.rows) > wanted:
+            self.alert_table.delete(self.rows.pop())
+        self.render()
+
+    def scroll_by(self, rows):
+        self.offset = max(0, min(self.offset + rows, len(self.episodes) - len(self.rows)))
+        self.render()
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == tk.MOVETO:
+            self.offset = int(float(amount) * len(self.episodes))
+            self.scroll_by(0)
+        else:
+            self.scroll_by(int(amount) * (len(self.rows) if unit == tk.PAGES else 1))
+
+    def render(self):
+        key = (self.episodes.version, self.offset, len(self.rows))
+        if key == self.rendered:
+            return
+        self.rendered = key
+        window = self.episodes.window(self.offset, len(self.rows))
+        for index, row in enumerate(self.rows):
+            if index < len(window):
+                episode = window[index]
+                self.alert_table.item(row, values=(episode.patient, episode.alert,
+                                                   time.strftime("%H:%M:%S", time.localtime(episode.first_seen)),
+                                                   time.strftime("%H:%M:%S", time.localtime(episode.last_seen)),
+                                                   episode.count))
             else:
-                self.alert_table.item(item, tags=('oddrow',))
+                self.alert_table.item(row, values=("",) * 5)
+        total = max(len(self.episodes), 1)
+        self.scrollbar.set(self.offset / total, min(1.0, (self.offset + len(self.rows)) / total))
+
+    def refresh(self):
+        shown = len(self.pending_latency)
+        self.render()
+        self.observe_latency(shown)
+        self.after(self.refresh_interval, self.refresh)
+
+    def observe_latency(self, shown):
+        now = time.monotonic()
+        for _ in range(shown):
+            latency = now - self.pending_latency.popleft()
+            metrics.observe("sensor_to_alert", latency)
+            if latency > ALERT_LATENCY_TARGET:
+                metrics.increment("alert_latency_breach")
+
+    def refresh_summary(self):
+        since = time.time() - self.summary_window
+        top = ", ".join(f"{patient} ({count})" for patient, count in self.alert_store.top_patients(5, since=since))
+        by_type = ", ".join(f"{alert_type}: {count}" for alert_type, count in sorted(self.alert_store.counts_by_type().items()))
+        self.summary_label.config(text=f"Top patients, last {self.summary_window // 60} min: {top or 'none'}\nTotal alerts: {len(self.alert_store)} ({by_type or 'none'})")
+        self.after(self.summary_interval, self.refresh_summary)
+
+# Class for the pipeline metrics panel
+class MetricsWindow(tk.Toplevel):
+    def __init__(self, master, json_file="pipeline_metrics.json", prometheus_file="pipeline_metrics.prom"):
+        tk.Toplevel.__init__(self, master)
+        self.title("Pipeline Metrics")
+        self.geometry("700x400")
+        self.configure(bg="#282c34")
+        self.json_file = json_file
+        self.prometheus_file = prometheus_file
+
+        self.queue_label = tk.Label(self, text="Queue depth: 0", bg="#282c34", fg="#ffffff", font=("Helvetica", 12))
+        self.queue_label.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
+
+        self.alert_latency_label = tk.Label(self, text="", bg="#282c34", fg="#ffffff", font=("Helvetica", 12))
+        self.alert_latency_label.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
+
+        self.queue_policy = tk.StringVar(value=data_queue.policy)
+        self.policy_selector = ttk.Combobox(self, textvariable=self.queue_policy, values=SheddingQueue.POLICIES, state="readonly")
+        self.policy_selector.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
+        self.policy_selector.bind("<<ComboboxSelected>>", lambda event: data_queue.set_policy(self.queue_policy.get()))
+
+        columns = ("Stage", "Count", "p50 (ms)", "p95 (ms)", "p99 (ms)", "Max (ms)")
+        self.stage_table = ttk.Treeview(self, columns=columns, show='headings', height=5)
+        for column in columns:
+            self.stage_table.heading(column, text=column)
+            self.stage_table.column(column, width=100)
+        self.stage_table.pack(fill=tk.X, padx=10, pady=5)
+
+        self.thread_table = ttk.Treeview(self, columns=("Thread", "Items", "Items/s"), show='headings')
+        for column in ("Thread", "Items", "Items/s"):
+            self.thread_table.heading(column, text=column)
+        self.thread_table.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        self.refresh_interval = 1000  # 1 second
+        self.dump_interval = 5000  # 5 seconds
+        self.refresh()
+        self.after(self.dump_interval, self.dump_periodically)
+
+    def refresh(self):
+        metrics.sample(data_queue.depth(), data_queue.shed_counts(), data_queue.over_capacity())
+        snapshot = metrics.snapshot()
+        shed = ", ".join(f"{reason}: {count}" for reason, count in sorted(snapshot["shed"].items())) or "none"
+        self.queue_label.config(text=f"Queue depth: {snapshot['queue_depth']}/{data_queue.capacity} (max {snapshot['queue_depth_max']}, deepest partition {max(data_queue.depths())}, priority {data_queue.priority_depth()}, "
+                                     f"critical over capacity {snapshot['admitted_over_capacity']}) - shed: {shed}")
+
+        alert_latency = snapshot["stages"].get("sensor_to_alert")
+        if alert_latency:
+            breaches = snapshot["events"].get("alert_latency_breach", 0)
+            status = "met" if alert_latency["p99"] <= ALERT_LATENCY_TARGET else "MISSED"
+            self.alert_latency_label.config(
+                text=f"Sensor to alert: p99 {alert_latency['p99'] * 1000:.1f} ms, target {ALERT_LATENCY_TARGET * 1000:.0f} ms {status} ({breaches} of {alert_latency['count']} over target)",
+                fg="#98c379" if status == "met" else "#e06c75")
+
+        self.stage_table.delete(*self.stage_table.get_children())
+        for stage, summary in snapshot["stages"].items():
+            self.stage_table.insert('', 'end', values=(stage, summary["count"], *(f"{summary[key] * 1000:.1f}" for key in ("p50", "p95", "p99", "max"))))
+
+        self.thread_table.delete(*self.thread_table.get_children())
+        for name, count in sorted(snapshot["thread_items"].items()):
+            self.thread_table.insert('', 'end', values=(name, count, f"{snapshot['thread_throughput'].get(name, 0.0):.2f}"))
+
+        self.after(self.refresh_interval, self.refresh)
+
+    def dump(self):
+        metrics.dump_json(self.json_file)
+        metrics.dump_prometheus(self.prometheus_file)
+
+    def dump_periodically(self):
+        self.dump()
+        self.after(self.dump_interval, self.dump_periodically)
 
 class Application(tk.Tk):
     def __init__(self):
@@ -435,144 +1002,282 @@ class Application(tk.Tk):
         self.start_button = tk.Button(main_frame, text="Start", command=self.start_all, bg="#98c379", fg="#ffffff", font=("Helvetica", 12, "bold"))
         self.start_button.pack(padx=10, pady=10)
 
+        self.use_fleet = tk.BooleanVar(value=False)
+        self.fleet_check = tk.Checkbutton(main_frame, text="Simulated sensor fleet (load test)", variable=self.use_fleet, bg="#282c34", fg="#ffffff", selectcolor="#1c1f24", activebackground="#282c34")
+        self.fleet_check.pack(padx=10, pady=5)
+        self.fleet_producer = None
+
+        self.use_gateway = tk.BooleanVar(value=False)
+        self.gateway_check = tk.Checkbutton(main_frame, text=f"Accept network sensors (port {GATEWAY_PORT})", variable=self.use_gateway, bg="#282c34", fg="#ffffff", selectcolor="#1c1f24", activebackground="#282c34")
+        self.gateway_check.pack(padx=10, pady=5)
+        self.gateway_thread = None
+
         self.stop_button = tk.Button(main_frame, text="Stop", command=self.stop_all, bg="#e06c75", fg="#ffffff", font=("Helvetica", 12, "bold"))
         self.stop_button.pack(padx=10, pady=10)
 
         self.view_graph_button = tk.Button(main_frame, text="View History", command=self.open_history_window, bg="#61afef", fg="#ffffff", font=("Helvetica", 12, "bold"))
         self.view_graph_button.pack(padx=10, pady=10)
 
+        self.ward_button = tk.Button(main_frame, text="Ward Overview", command=self.open_ward_overview, bg="#61afef", fg="#ffffff", font=("Helvetica", 12, "bold"))
+        self.ward_button.pack(padx=10, pady=10)
+
         self.generate_report_button = tk.Button(main_frame, text="Generate Report", command=self.generate_alert_report, bg="#d19a66", fg="#ffffff", font=("Helvetica", 12, "bold"))
         self.generate_report_button.pack(padx=10, pady=10)
 
         self.open_report_button = tk.Button(main_frame, text="Open Report", command=self.open_report, bg="#c678dd", fg="#ffffff", font=("Helvetica", 12, "bold"))
         self.open_report_button.pack(padx=10, pady=10)
 
+        bed_frame = tk.Frame(main_frame, bg="#282c34")
+        bed_frame.pack(padx=10, pady=10)
+        self.admit_button = tk.Button(bed_frame, text="Admit Patient", command=self.admit_patient, bg="#98c379", fg="#ffffff", font=("Helvetica", 12, "bold"))
+        self.admit_button.pack(side=tk.LEFT, padx=5)
+        self.discharge_button = tk.Button(bed_frame, text="Discharge Selected", command=self.discharge_patient, bg="#e06c75", fg="#ffffff", font=("Helvetica", 12, "bold"))
+        self.discharge_button.pack(side=tk.LEFT, padx=5)
+
+        profile_frame = tk.Frame(main_frame, bg="#282c34")
+        profile_frame.pack(padx=10, pady=10)
+        self.profile_mode = tk.StringVar(value="sampling")
+        self.profile_duration = tk.StringVar(value="10")
+        ttk.Combobox(profile_frame, textvariable=self.profile_mode, values=RuntimeProfiler.MODES, width=10, state="readonly").pack(side=tk.LEFT, padx=5)
+        tk.Entry(profile_frame, textvariable=self.profile_duration, width=5).pack(side=tk.LEFT, padx=5)
+        self.profile_button = tk.Button(profile_frame, text="Profile", command=self.toggle_profiling, bg="#56b6c2", fg="#ffffff", font=("Helvetica", 12, "bold"))
+        self.profile_button.pack(side=tk.LEFT, padx=5)
+
         self.producers = []
         self.consumers = []
         self.forecasters = []
         self.stop_event = threading.Event()
-        self.alert_log = []
+        self.forecast_gate = WorkerGate()
+        self.stopping = False
+        self.on_stopped = []
+        self.alert_log = AlertStore()
         self.report_file = "all_patients_alert_report.pdf"
+        self.report_builder = AlertReportBuilder(self.report_file)
+        self.alert_exporter = AlertExporter("all_patients_alerts.csv", "all_patients_alerts.jsonl")
 
         self.data_monitor = DataMonitor(main_frame)
         self.data_monitor.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
-        self.alert_window = AlertWindow(self)
+        self.alert_window = AlertWindow(self, self.alert_log)
+        self.metrics_window = MetricsWindow(self)
+        self.ward_overview = None
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def open_history_window(self):
         self.data_monitor.open_history_window()
 
+    def open_ward_overview(self):
+        if self.ward_overview is not None and self.ward_overview.winfo_exists():
+            self.ward_overview.lift()
+            return
+        self.ward_overview = WardOverview(self, self.data_monitor, self.alert_log)
+
+    def admit_patient(self):
+        patient_id = patients.admit()
+        # While running, the new bed joins the fleet or the least loaded producer
+        if self.fleet_producer is not None:
+            self.fleet_producer.set_patients(patients.patient_ids())
+        elif self.producers:
+            min(self.producers, key=lambda producer: len(producer.patient_ids)).patient_ids.append(patient_id)
+        self.log_widget.insert(tk.END, f"Admitted {patients[patient_id]}\n", 'info')
+
+    def discharge_patient(self):
+        patient_id = self.data_monitor.selected_patient_id()
+        if patient_id not in patients or len(patients) == 1:
+            return
+        for producer in self.producers:
+            if patient_id in getattr(producer, "patient_ids", ()):
+                producer.patient_ids.remove(patient_id)
+        patients.discharge(patient_id)
+        if self.fleet_producer is not None:
+            self.fleet_producer.set_patients(patients.patient_ids())
+        self.data_monitor.selected_patient.set(patients.patient_names()[0])
+        self.data_monitor.on_patient_change(None)
+        self.log_widget.insert(tk.END, f"Discharged {patients[patient_id]}\n", 'info')
+
     def start_all(self):
+        if self.producers or self.stopping:
+            return
         self.stop_event.clear()
-        self.producers = []
-        self.consumers = []
-        self.forecasters = []
-        self.alert_log = []
-
+        self.alert_log.clear()
+        self.report_builder.reset()
+        self.alert_exporter.reset()
+        metrics.reset()
+
+        patient_ids = patients.patient_ids()
+        producer_count = min(MAX_PRODUCERS, len(patient_ids))
+        self.fleet_producer = None
         with concurrent.futures.ThreadPoolExecutor() as executor:
-            for i in range(100):
-                producer = Producer(self.log_widget, self.stop_event, i)
-                self.producers.append(producer)
-                executor.submit(producer.start)
-
-            for i in range(10):
-                consumer = Consumer(self.log_widget, self.alert_window.alert_table, self.stop_event, i, self.alert_log, self.data_monitor)
-                self.consumers.append(consumer)
-                executor.submit(consumer.start)
-
-            for i in range(5):
-                forecaster = Forecaster(self.log_widget, self.stop_event, self.data_monitor)
-                self.forecasters.append(forecaster)
-                executor.submit(forecaster.start)
-
-    def stop_all(self):
+            if self.use_fleet.get():
+                self.fleet_producer = FleetProducer(self.log_widget, self.stop_event, patient_ids)
+                self.producers.append(self.fleet_producer)
+                executor.submit(self.fleet_producer.start)
+            else:
+                for i in range(producer_count):
+                    producer = Producer(self.log_widget, self.stop_event, i, patient_ids[i::producer_count])
+                    self.producers.append(producer)
+                    executor.submit(producer.start)
+
+            if self.use_gateway.get():
+                self.start_gateway()
+
+            # Consumers and forecasters are started once and reused by every
+            # later Start (warm restart)
+            if not self.consumers:
+                for i in range(NUM_CONSUMERS):
+                    consumer = Consumer(self.log_widget, self.alert_window, i, self.alert_log, self.data_monitor)
+                    self.consumers.append(consumer)
+                    executor.submit(consumer.start)
+
+            if not self.forecasters:
+                for i in range(5):
+                    forecaster = Forecaster(self.log_widget, self.forecast_gate, self.data_monitor, forecaster_id=i)
+                    self.forecasters.append(forecaster)
+                    executor.submit(forecaster.start)
+        self.forecast_gate.open()
+
+    def start_gateway(self):
+        gateway = SensorGateway(self.ingest_block, GATEWAY_HOST, GATEWAY_PORT, udp_port=GATEWAY_PORT,
+                                known_patients=lambda patient_ids: np.isin(patient_ids, patients.patient_ids()))
+        self.gateway_thread = GatewayThread(gateway)
+        self.gateway_thread.start()
+        self.gateway_thread.started.wait()
+        if self.gateway_thread.error is not None:
+            self.log_widget.insert(tk.END, f"Cannot start sensor gateway: {self.gateway_thread.error}\n", 'error')
+            self.gateway_thread = None
+            return
+        self.log_widget.insert(tk.END, f"Sensor gateway listening on {GATEWAY_HOST}:{GATEWAY_PORT}\n", 'info')
+
+    # Called on the gateway thread with each decoded batch
+    def ingest_block(self, block, peer):
+        route_block(block, self.stop_event)
+        metrics.count(f"Gateway {peer}", len(block.patient_ids))
+
+    # The gateway thread is only asked to stop here; finish_stop() waits for
+    # it from the Tk loop
+    def stop_gateway(self):
+        if self.gateway_thread is not None:
+            self.gateway_thread.stop()
+
+    def gateway_stopped(self):
+        if self.gateway_thread is None:
+            return
+        if self.gateway_thread.is_alive():
+            self.log_widget.insert(tk.END, "Sensor gateway did not stop before the drain deadline\n", 'error')
+            log.error("Sensor gateway did not stop before the drain deadline")
+        for stats in self.gateway_thread.gateway.connection_stats():
+            self.log_widget.insert(tk.END, f"Gateway {stats['transport']} {stats['peer']}: {stats['readings']} readings, {stats['rejected']} rejected, "
+                                           f"{stats['errors']} bad frames, {stats['readings_per_second']:.0f} readings/s\n", 'info')
+        self.gateway_thread = None
+
+    # Stop returns at once: producers and the gateway are stopped, then
+    # finish_stop() polls from the Tk loop until they have exited and the
+    # in-flight readings are processed (or STOP_DRAIN_TIMEOUT expires) before
+    # writing the report. on_stopped runs once the stop has finished, also
+    # when a stop is already under way
+    def stop_all(self, on_stopped=None):
+        if on_stopped is not None and on_stopped not in self.on_stopped:
+            self.on_stopped.append(on_stopped)
+        if self.stopping:
+            return
+        if not self.producers:
+            self.run_on_stopped()
+            return
+        self.stopping = True
         self.stop_event.set()
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = [executor.submit(producer.join) for producer in self.producers]
-            futures += [executor.submit(consumer.join) for consumer in self.consumers]
-            futures += [executor.submit(forecaster.join) for forecaster in self.forecasters]
-            concurrent.futures.wait(futures)
+        self.forecast_gate.pause()
+        self.stop_gateway()
+        self.start_button.config(state=tk.DISABLED)
+        self.stop_button.config(state=tk.DISABLED)
+        self.after(50, self.finish_stop, time.monotonic() + STOP_DRAIN_TIMEOUT)
+
+    def finish_stop(self, deadline):
+        draining = any(producer.is_alive() for producer in self.producers) or data_queue.pending()
+        draining = draining or (self.gateway_thread is not None and self.gateway_thread.is_alive())
+        if draining and time.monotonic() < deadline:
+            self.after(50, self.finish_stop, deadline)
+            return
+        self.gateway_stopped()
+        discarded = data_queue.discard("stopped")
+        if discarded:
+            self.log_widget.insert(tk.END, f"Discarded {discarded} queued readings after the {STOP_DRAIN_TIMEOUT:.0f} s drain deadline\n", 'error')
+            log.warning("Discarded %d queued readings after the drain deadline", discarded)
         self.producers.clear()
-        self.consumers.clear()
-        self.forecasters.clear()
-        self.stop_event.clear()
+        self.fleet_producer = None
+        self.stopping = False
+        self.start_button.config(state=tk.NORMAL)
+        self.stop_button.config(state=tk.NORMAL)
+        self.metrics_window.dump()
         self.generate_alert_report()
-
+        self.run_on_stopped()
+
+    def run_on_stopped(self):
+        callbacks, self.on_stopped = self.on_stopped, []
+        for callback in callbacks:
+            callback()
+
+    # Window close: stop (with the usual drain and report), then end the
+    # worker pools and leave the Tk loop
+    def on_close(self):
+        self.stop_all(on_stopped=self.shutdown)
+
+    # The workers are not joined here: they may be writing to the log widget,
+    # which needs the Tk loop running, so finish_shutdown() polls like
+    # finish_stop()
+    def shutdown(self):
+        self.forecast_gate.close()
+        for partition in data_queue.partitions:
+            partition.put_sentinel(SHUTDOWN)
+        self.after(50, self.finish_shutdown, time.monotonic() + SHUTDOWN_TIMEOUT)
+
+    def finish_shutdown(self, deadline):
+        running = [thread.name for thread in self.consumers + self.forecasters if thread.is_alive()]
+        if running and time.monotonic() < deadline:
+            self.after(50, self.finish_shutdown, deadline)
+            return
+        if running:
+            log.error("Workers still running at exit: %s", ", ".join(running))
+        self.destroy()
+
+    def toggle_profiling(self):
+        if profiler.active:
+            profiler.stop()
+            return
+        duration = float(self.profile_duration.get())
+        if profiler.start(duration, self.profile_mode.get(), on_complete=self.on_profile_complete):
+            self.profile_button.config(text="Stop Profiling")
+            self.log_widget.insert(tk.END, f"Profiling ({self.profile_mode.get()}) for {duration:.0f} seconds\n", 'info')
+
+    def on_profile_complete(self, mode, paths):
+        self.profile_button.config(text="Profile")
+        self.log_widget.insert(tk.END, f"Profiles ({mode}) written: {', '.join(paths)}\n", 'info')
+        log.info("Profiles (%s) written: %s", mode, ", ".join(paths))
+
+    # The PDF and the exports are built from the same snapshot, so they cover
+    # exactly the same alerts even while consumers keep adding new ones
     def generate_alert_report(self):
-        alerts_by_patient = {}
-        for alert in self.alert_log:
-            patient_name = alert[0]
-            if patient_name not in alerts_by_patient:
-                alerts_by_patient[patient_name] = []
-            alerts_by_patient[patient_name].append(alert)
-
-        doc = SimpleDocTemplate(self.report_file, pagesize=letter)
-        elements = []
-
-        styles = getSampleStyleSheet()
-        styles.add(ParagraphStyle(name='TableHeader', alignment=TA_CENTER, fontSize=10, fontName='Helvetica-Bold', textColor=colors.whitesmoke, backColor=colors.grey, padding=3))
-        styles.add(ParagraphStyle(name='TableCell', alignment=TA_CENTER, fontSize=8, fontName='Helvetica', padding=3))
-
-        title = Paragraph("Comprehensive Alert Report", styles['Title'])
-        elements.append(title)
-        elements.append(Paragraph(f"Generated on: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
-        elements.append(Spacer(1, 12))
-
-        for patient_name, alerts in alerts_by_patient.items():
-            elements.append(Paragraph(f"Alert Report for {patient_name}", styles['Heading2']))
-            elements.append(Spacer(1, 12))
-
-            table_data = [
-                [Paragraph("Timestamp", styles['TableHeader']),
-                 Paragraph("Temperature", styles['TableHeader']),
-                 Paragraph("Heart Rate", styles['TableHeader']),
-                 Paragraph("Oxygen Level", styles['TableHeader']),
-                 Paragraph("Blood Pressure", styles['TableHeader']),
-                 Paragraph("Alert", styles['TableHeader'])]]
-
-            for alert in alerts:
-                row = [Paragraph(alert[1], styles['TableCell']),
-                       Paragraph(str(alert[2]), styles['TableCell']),
-                       Paragraph(str(alert[3]), styles['TableCell']),
-                       Paragraph(str(alert[4]), styles['TableCell']),
-                       Paragraph(f"{alert[5][0]}/{alert[5][1]}", styles['TableCell']),
-                       Paragraph(alert[6], styles['TableCell'])]
-                table_data.append(row)
-
-            table = Table(table_data, colWidths=[doc.width/6.0]*6)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 😎,
-                ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
-                ('TOPPADDING', (0, 1), (-1, -1), 6)
-            ]))
-            elements.append(table)
-            elements.append(Spacer(1, 24))
-
+        snapshot = self.alert_log.snapshot()
         with concurrent.futures.ThreadPoolExecutor() as executor:
-            future = executor.submit(doc.build, elements)
-            future.result()
+            future = executor.submit(self.report_builder.build, snapshot)
+            updated = future.result()
+        exported = self.alert_exporter.export(snapshot)
 
-        self.log_widget.insert(tk.END, f"Comprehensive report generated: {self.report_file}\n", 'info')
-        print(f"Comprehensive report generated: {self.report_file}")
+        self.log_widget.insert(tk.END, f"Comprehensive report generated: {self.report_file} ({updated} updated sections, {exported} alerts exported)\n", 'info')
+        log.info("Comprehensive report generated: %s (%d updated sections, %d alerts exported)", self.report_file, updated, exported)
 
     def open_report(self):
         if os.path.exists(self.report_file):
             webbrowser.get('firefox').open_new_tab(self.report_file)
             self.log_widget.insert(tk.END, f"Opened report in Firefox: {self.report_file}\n", 'info')
-            print(f"Opened report in Firefox: {self.report_file}")
+            log.info("Opened report in Firefox: %s", self.report_file)
         else:
             self.log_widget.insert(tk.END, f"Report file does not exist: {self.report_file}\n", 'error')
-            print(f"Report file does not exist: {self.report_file}")
-
-if _name_ == "_main_":
-    app = Application()
-    app.mainloop()
+            log.error("Report file does not exist: %s", self.report_file)
+
+if __name__ == "__main__":
+    log_listener = setup_logging("surveillance.log")
+    try:
+        app = Application()
+        app.mainloop()
+    finally:
+        log_listener.stop()
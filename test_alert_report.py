@@ -0,0 +1,20 @@
+from alert_report import AlertReportBuilder
+from alert_store import AlertStore
+from vitals import VITALS
+
+def fill(store, count, patients=10):
+    for i in range(count):
+        store.add(f"Patient {i % patients}", f"2026-01-01 00:{i // 60:02d}:{i % 60:02d}",
+                  [vital.threshold for vital in VITALS], "Tachycardia\n", ["Tachycardia"])
+
+# Regression: the cached section headings were reused across builds, and a
+# flowable already split across pages by one build fails to lay out in the
+# next one once the report runs past a page
+def test_rebuild_multi_page_report(tmp_path):
+    store = AlertStore()
+    builder = AlertReportBuilder(str(tmp_path / "report.pdf"))
+    fill(store, 300)
+    assert builder.build(store) == 10
+    assert builder.build(store) == 0
+    fill(store, 30)
+    assert builder.build(store) == 10
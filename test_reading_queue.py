@@ -0,0 +1,121 @@
+import queue
+import threading
+import time
+import pytest
+from reading_queue import SheddingQueue
+
+def fill(q, count, key=0):
+    for i in range(count):
+        assert q.put(i, key=key)
+
+def drain(q):
+    items = []
+    while q.qsize():
+        items.append(q.get_nowait())
+        q.task_done()
+    return items
+
+def test_block_waits_for_room():
+    q = SheddingQueue(capacity=3)
+    fill(q, 3)
+    with pytest.raises(queue.Full):
+        q.put(3, block=False)
+    with pytest.raises(queue.Full):
+        q.put(3, timeout=0.01)
+    threading.Timer(0.05, q.get).start()
+    assert q.put(3, timeout=1)
+    assert q.depth() == 3 and not q.shed_counts()
+
+def test_drop_oldest_discards_oldest_routine():
+    q = SheddingQueue(capacity=3, policy="drop_oldest")
+    fill(q, 5)
+    assert drain(q) == [2, 3, 4]
+    assert q.shed_counts() == {"dropped_oldest": 2}
+
+def test_downsample_keeps_every_nth_above_watermark():
+    q = SheddingQueue(capacity=8, policy="downsample", downsample_watermark=0.5, downsample_keep=4)
+    for i in range(12):
+        q.put(i, key=1)
+    assert drain(q) == [0, 1, 2, 3, 7, 11]
+    assert q.shed_counts() == {"downsampled": 6}
+    assert q.shed_by_patient[1] == 6
+
+def test_block_entries_count_readings():
+    q = SheddingQueue(capacity=4, policy="drop_oldest")
+    assert q.put("a", keys=[1, 2])
+    assert q.put("b", keys=[3, 4, 5])
+    assert drain(q) == ["b"]
+    assert q.shed_counts() == {"dropped_oldest": 2}
+
+def test_downsample_block_entries_per_reading():
+    q = SheddingQueue(capacity=100, policy="downsample", downsample_watermark=0, downsample_keep=2)
+    select = lambda kept: [reading for reading, keep in zip(readings, kept) if keep]
+    readings = ["a1", "b1", "a2", "b2", "c1"]
+    assert q.put(readings, keys=["a", "b", "a", "b", "c"], select=select)
+    assert drain(q) == [["a2", "b2"]]
+    assert q.shed_counts() == {"downsampled": 3}
+    assert dict(q.shed_by_patient) == {"a": 1, "b": 1, "c": 1}
+
+def test_critical_takes_place_of_routine():
+    q = SheddingQueue(capacity=3)
+    fill(q, 3)
+    assert q.put("c", critical=True, key=0)
+    assert drain(q) == ["c", 1, 2]
+    assert q.shed_counts() == {"dropped_for_critical": 1}
+
+def test_critical_headroom():
+    q = SheddingQueue(capacity=10, critical_headroom=0.2)
+    for i in range(12):
+        assert q.put(i, critical=True)
+    assert not q.put(12, critical=True)
+    assert q.over_capacity() == 2
+    assert q.shed_counts() == {"rejected_critical": 1}
+    assert q.depth() == q.priority_depth() == 12
+
+def test_priority_lane_served_first():
+    q = SheddingQueue(capacity=10)
+    q.put("r1")
+    q.put("c1", critical=True)
+    q.put("r2")
+    q.put("c2", critical=True)
+    assert drain(q) == ["c1", "c2", "r1", "r2"]
+
+def test_sentinel_is_never_shed():
+    q = SheddingQueue(capacity=2, critical_headroom=0.5)
+    fill(q, 2)
+    for i in range(3):
+        q.put(i, critical=True)
+    q.put_sentinel("stop")
+    assert "stop" in drain(q)
+
+def test_blocked_put_follows_policy_change():
+    q = SheddingQueue(capacity=3)
+    fill(q, 3)
+    result = []
+    producer = threading.Thread(target=lambda: result.append(q.put(3, timeout=5)))
+    producer.start()
+    time.sleep(0.05)
+    q.set_policy("drop_oldest")
+    producer.join(5)
+    assert result == [True]
+    assert q.depth() == 3
+    assert q.shed_counts() == {"dropped_oldest": 1}
+    assert drain(q) == [1, 2, 3]
+
+def test_blocked_put_shed_after_switch_to_downsample():
+    q = SheddingQueue(capacity=3, downsample_keep=2)
+    fill(q, 3)
+    result = []
+    producer = threading.Thread(target=lambda: result.append(q.put(3, timeout=5, key=0)))
+    producer.start()
+    time.sleep(0.05)
+    q.set_policy("downsample")
+    producer.join(5)
+    assert result == [False]
+    assert q.depth() == 3
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        SheddingQueue(policy="lifo")
+    with pytest.raises(ValueError):
+        SheddingQueue().set_policy("lifo")
@@ -0,0 +1,62 @@
+import threading
+import numpy as np
+import pytest
+import surveillance_multi as multi
+from sensor_fleet import ReadingBlock
+from vitals import VITALS, VitalSeries
+
+def drain(patient_id):
+    partition = multi.data_queue.partitions[multi.data_queue.partition_for(patient_id)]
+    entries = []
+    while partition.qsize():
+        entries.append(partition.get_nowait())
+        partition.task_done()
+    return entries
+
+def enqueue_readings(patient_id, values):
+    producer = multi.Producer(None, threading.Event(), 0, [patient_id])
+    for value in values:
+        item = "2026-01-01 00:00:00" + "".join(f", {vital.short}: {value}" for vital in VITALS)
+        assert producer.enqueue(patient_id, item, critical=False)
+
+# Admits patients into the shared registry for one test, then drains their
+# partitions and discharges them
+@pytest.fixture
+def admit():
+    admitted = []
+    def admit(name):
+        patient_id = multi.patients.admit(name)
+        admitted.append(patient_id)
+        drain(patient_id)
+        return patient_id
+    yield admit
+    for patient_id in admitted:
+        drain(patient_id)
+        multi.patients.discharge(patient_id)
+
+# Regression: sequence numbers restarted at 1 with every new Producer, so after
+# Stop/Start the new readings sorted before the history kept from the first
+# run, or were dropped as older than all of it
+def test_sequences_continue_after_restart(admit):
+    patient_id = admit("Sequence test")
+    series = VitalSeries(history=5)
+
+    enqueue_readings(patient_id, range(7))
+    enqueue_readings(patient_id, range(7, 10))  # new producers after Stop/Start
+    entries = drain(patient_id)
+    sequences = [sequence for _, _, _, _, sequence in entries]
+    assert sequences == sorted(sequences) and len(set(sequences)) == 10
+
+    for _, item, _, _, sequence in entries:
+        value = float(item.split(", ")[1].split(": ")[1])
+        series.insert(item.split(", ")[0], [value] * len(VITALS), False, sequence)
+    assert series.snapshot.values[:, 0].tolist() == [5.0, 6.0, 7.0, 8.0, 9.0]
+
+def test_block_sequences_follow_producer_sequences(admit):
+    patient_id = admit("Block sequence test")
+    enqueue_readings(patient_id, range(3))
+    first = [sequence for *_, sequence in drain(patient_id)]
+    block = ReadingBlock(np.array([patient_id, patient_id]), np.zeros(2), np.full((2, len(VITALS)), 20.0))
+    multi.route_block(block, threading.Event())
+    (entry,) = drain(patient_id)
+    assert entry[4].tolist() == [max(first) + 1, max(first) + 2]
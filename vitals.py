@@ -0,0 +1,152 @@
+import threading
+from collections import namedtuple
+import numpy as np
+
+# One monitored vital sign. The alert rule `alert` fires when the value is
+# above `threshold` (below it when `above` is False), and the reading is
+# critical, i.e. takes the queues' priority lane, past `critical` in the same
+# direction (NEWS2 red-score levels); `valid_range` bounds
+# plausible sensor values, `display_range` is the fixed scale of the ward
+# overview sparklines, and `simulated_range` / `fleet_profile` (baseline mean,
+# spread between patients, measurement noise) drive the simulators.
+Vital = namedtuple("Vital", ("key", "label", "short", "unit", "decimals", "alert", "threshold", "critical", "above", "valid_range",
+                             "display_range", "color", "simulated_range", "fleet_profile"))
+
+# The vitals monitored, declared once; readings, stores, charts, forecasts,
+# reports and the network format all follow this order
+VITALS = (
+    Vital("temperature", "Temperature", "Temp", "°C", 2, "Fever", 37.5, 39.0, True, (25.0, 45.0), (35.0, 40.0), "#e5c07b", (36.0, 39.0), (36.8, 0.3, 0.1)),
+    Vital("heart_rate", "Heart Rate", "HR", "bpm", 0, "Tachycardia", 100, 130, True, (20, 250), (40, 140), "#61afef", (60, 120), (78.0, 8.0, 3.0)),
+    Vital("oxygen_level", "Oxygen Level", "O2", "%", 2, "Hypoxia", 95.0, 92.0, False, (50.0, 100.0), (85.0, 100.0), "#98c379", (90.0, 100.0), (97.5, 1.0, 0.6)),
+    Vital("systolic", "Systolic Pressure", "SYS", "mmHg", 0, "Hypertension", 130, 180, True, (50, 260), (80, 180), "#e06c75", (90, 140), (118.0, 10.0, 4.0)),
+    Vital("diastolic", "Diastolic Pressure", "DIA", "mmHg", 0, "Hypertension", 85, 110, True, (30, 160), (50, 110), "#c678dd", (60, 90), (76.0, 6.0, 3.0)),
+    Vital("respiratory_rate", "Respiratory Rate", "RR", "/min", 0, "Tachypnea", 24, 28, True, (4, 60), (8, 35), "#56b6c2", (12, 26), (16.0, 2.0, 1.0)),
+)
+VITAL_KEYS = tuple(vital.key for vital in VITALS)
+DECIMALS = np.array([vital.decimals for vital in VITALS])
+THRESHOLDS = np.array([vital.threshold for vital in VITALS], dtype=float)
+CRITICAL = np.array([vital.critical for vital in VITALS], dtype=float)
+ABOVE = np.array([vital.above for vital in VITALS])
+# Alert names in rule order (vitals may share a rule, e.g. both pressures)
+ALERT_NAMES = tuple(dict.fromkeys(vital.alert for vital in VITALS))
+
+def format_value(vital, value):
+    return f"{value:.{vital.decimals}f}"
+
+def round_values(values):
+    values = np.array(values, dtype=float)
+    for column, decimals in enumerate(DECIMALS.tolist()):
+        values[..., column] = np.round(values[..., column], decimals)
+    return values
+
+# Alert rules, run by the consumers
+def check_thresholds(values):
+    alerts = []
+    for vital, value in zip(VITALS, values):
+        if (value > vital.threshold if vital.above else value < vital.threshold) and vital.alert not in alerts:
+            alerts.append(vital.alert)
+    return alerts
+
+# Same rules on an (n x vitals) array, one boolean array per alert name
+def check_thresholds_block(values):
+    crossed = np.where(ABOVE, values > THRESHOLDS, values < THRESHOLDS)
+    masks = dict.fromkeys(ALERT_NAMES)
+    for column, vital in enumerate(VITALS):
+        masks[vital.alert] = crossed[:, column] if masks[vital.alert] is None else masks[vital.alert] | crossed[:, column]
+    return masks
+
+# Narrower rules deciding which readings are critical
+def check_critical(values):
+    return any(value > vital.critical if vital.above else value < vital.critical for vital, value in zip(VITALS, values))
+
+# Same on an (n x vitals) array, one boolean per row
+def check_critical_block(values):
+    return np.where(ABOVE, values > CRITICAL, values < CRITICAL).any(axis=1)
+
+def read_only(array):
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+# Immutable point-in-time view of one patient's history: read-only views of
+# the last `history` rows (timestamps, rows x vitals values, alert flags) and
+# of the latest forecast
+class SeriesSnapshot(namedtuple("SeriesSnapshot", ("version", "timestamps", "values", "alerts", "forecast"))):
+    __slots__ = ()
+
+    # (timestamps, values, alerts) of the last `limit` rows
+    def rows(self, limit=None):
+        start = 0 if limit is None else max(len(self.values) - limit, 0)
+        return self.timestamps[start:], self.values[start:], self.alerts[start:]
+
+# Bounded history of one patient: all vitals in one contiguous (rows x vitals)
+# array, with the timestamps, alert flags and sequence numbers of the rows.
+# Every change publishes a new SeriesSnapshot by swapping a single reference,
+# so readers never lock and never copy. Rows covered by a published snapshot
+# are never written again: readings are appended past them, and a late
+# reading or a full buffer (twice the history, so appends are amortised O(1))
+# rebuilds the history into a fresh buffer, leaving the old one to the
+# snapshots still using it.
+class VitalSeries:
+    def __init__(self, history=100):
+        self.history = history
+        self.lock = threading.Lock()  # serialises writers only
+        self.version = 0
+        self.count = 0
+        self.forecast = read_only(np.empty((0, len(VITALS))))
+        self.allocate()
+        self.publish()
+
+    def allocate(self):
+        capacity = 2 * self.history
+        self.timestamps = np.empty(capacity, dtype=object)
+        self.values = np.empty((capacity, len(VITALS)))
+        self.alerts = np.zeros(capacity, dtype=bool)
+        self.sequences = np.zeros(capacity, dtype=np.int64)
+
+    def publish(self):
+        start = max(self.count - self.history, 0)
+        self.snapshot = SeriesSnapshot(self.version, read_only(self.timestamps[start:self.count]),
+                                       read_only(self.values[start:self.count]), read_only(self.alerts[start:self.count]),
+                                       self.forecast)
+
+    # Late readings are inserted by sequence number to keep history in order;
+    # returns the new snapshot
+    def insert(self, timestamp, values, alert, sequence=None):
+        with self.lock:
+            count = self.count
+            if sequence is None:
+                sequence = int(self.sequences[count - 1]) + 1 if count else 0
+            position = int(np.searchsorted(self.sequences[:count], sequence, side="right"))
+            if position < count + 1 - self.history:
+                return self.snapshot  # older than the whole history
+            if position == count and count < len(self.sequences):
+                self.timestamps[count], self.values[count], self.alerts[count], self.sequences[count] = timestamp, values, alert, sequence
+                self.count += 1
+            else:
+                start = max(count + 1 - self.history, 0)
+                old = (self.timestamps, self.values, self.alerts, self.sequences)
+                self.allocate()
+                for new, previous, row in zip((self.timestamps, self.values, self.alerts, self.sequences), old,
+                                              (timestamp, values, alert, sequence)):
+                    new[:position - start] = previous[start:position]
+                    new[position - start] = row
+                    new[position - start + 1:count - start + 1] = previous[position:count]
+                self.count = count - start + 1
+            self.version += 1
+            self.publish()
+            return self.snapshot
+
+    # forecast: (steps x vitals) array
+    def set_forecast(self, forecast):
+        with self.lock:
+            self.forecast = read_only(np.array(forecast, dtype=float))
+            self.version += 1
+            self.publish()
+            return self.snapshot
+
+    def rows(self, limit=None):
+        return self.snapshot.rows(limit)
+
+    def __len__(self):
+        return len(self.snapshot.values)